@@ -78,9 +78,58 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse a worker's connection across requests instead of reopening
+        # the file each time
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Writers take the write lock when their transaction begins, so
+            # a second writer waits out the timeout instead of failing with
+            # "database is locked" when it tries to upgrade a read lock
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Applied to every new SQLite connection by sports.signals.tune_sqlite. WAL
+# lets readers carry on while a writer commits; synchronous=NORMAL is
+# durable in WAL mode except for the last commits on power loss.
+SPORTS_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # KiB, i.e. 64 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Rendered pages live in a file-based cache so every worker process sees the
+# same entries and the invalidations triggered by admin edits.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'pages'),
+        'TIMEOUT': 60 * 60 * 24,
+    },
+    # django_ratelimit counters, shared by every worker process on the host
+    # with atomic increments; see sports.sqlite_cache
+    'ratelimit': {
+        'BACKEND': 'sports.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'ratelimit.sqlite3'),
+    },
+}
+RATELIMIT_USE_CACHE = 'ratelimit'
+
+SPORTS_PAGE_CACHE = 'pages'
+SPORTS_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,6 +166,27 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Serve collected static files through sports.serve.static_asset, which
+# picks precompressed variants and sends immutable headers for hashed names.
+# Turn off when the web server serves STATIC_ROOT itself.
+SPORTS_SERVE_STATIC = True
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Hashed, precompressed copies written by collectstatic
+    'staticfiles': {
+        'BACKEND': 'sports.storage.CompressedManifestStaticFilesStorage',
+    },
+    # Deduplicated storage for imported photos, see sports.storage
+    'content_addressed': {
+        'BACKEND': 'sports.storage.ContentAddressedStorage',
+        'OPTIONS': {'prefix': 'cas'},
+    },
+}
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),  # Path to your static folder
 ] 
@@ -128,3 +198,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Serve MEDIA_URL through sports.serve.media_file. With an offload mode the
+# view only checks the request and the web server sends the file:
+#   'x-accel-redirect'  nginx; SPORTS_MEDIA_ACCEL_PREFIX must be an internal
+#                       location aliased to MEDIA_ROOT
+#   'x-sendfile'        Apache mod_xsendfile or lighttpd
+SPORTS_SERVE_MEDIA = True
+SPORTS_MEDIA_OFFLOAD = None
+SPORTS_MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Photos can be replaced under the same name; content-addressed ones are
+# cached for good regardless
+SPORTS_MEDIA_MAX_AGE = 60 * 60 * 24 * 7
+
+# Page size for the cursor-paginated game APIs; ?size= is clamped to the max
+SPORTS_GAMES_PAGE_SIZE = 4
+SPORTS_GAMES_PAGE_SIZE_MAX = 20
+# Legends per page, and the cap on ?size= for the legends API
+SPORTS_LEGENDS_PAGE_SIZE = 12
+SPORTS_LEGENDS_PAGE_SIZE_MAX = 48
+
+# Route the "load more" game APIs to their async versions; turn on when
+# serving through mysite.asgi (see README)
+SPORTS_ASYNC_API = False
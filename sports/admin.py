@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Player, Team, Game, Opposition, Event, Legend, Coach
+from .models import Player, Team, Game, Opposition, Event, Legend, Coach, Job, TeamSeasonStats
 
 
 admin.site.register(Player)
@@ -8,4 +8,6 @@ admin.site.register(Game)
 admin.site.register(Opposition)
 admin.site.register(Event)
 admin.site.register(Legend)
-admin.site.register(Coach)
\ No newline at end of file
+admin.site.register(Coach)
+admin.site.register(Job)
+admin.site.register(TeamSeasonStats)
@@ -0,0 +1,178 @@
+import hashlib
+import uuid
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+
+# Rendered pages are stored under a key that embeds the current version of
+# every tag the page depends on. Invalidating a tag just gives it a fresh
+# version, so every page that depends on it misses on the next request and is
+# re-rendered; nothing has to enumerate or delete the stale entries.
+#
+# Tags used by the views:
+#   index           the home page
+#   teams           the team list
+#   rosters         every roster page (team details shown on all of them)
+#   team:<name>     the roster page of one team
+#   standings       every standings page
+#   legends         the legends listing and its cached count
+
+
+def page_cache():
+    return caches[getattr(settings, 'SPORTS_PAGE_CACHE', 'default')]
+
+
+def _digest(value):
+    # Team names contain spaces, which some cache backends reject in keys
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def _tag_key(tag):
+    return f'sports:tag:{_digest(tag)}'
+
+
+def _tag_versions(tags):
+    cache = page_cache()
+    keys = [_tag_key(tag) for tag in tags]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A tag that was never set or has been evicted starts a new
+            # version; falling back to a constant could resurrect pages
+            # cached before an invalidation.
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def invalidate(*tags):
+    """Give each tag a new version once the current transaction commits.
+
+    Deferring to commit stops a concurrent request from re-caching the old
+    data between the signal firing and the write becoming visible.
+    """
+    def bump():
+        page_cache().set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+    transaction.on_commit(bump)
+
+
+def invalidate_all():
+    invalidate('index', 'teams', 'rosters', 'standings')
+
+
+def _versioned_key(kind, name, parts, tags):
+    key_parts = [name, *(str(p) for p in parts), *_tag_versions(tags)]
+    return f'sports:{kind}:{name}:{_digest(":".join(key_parts))}'
+
+
+def get_or_set_by_tags(name, parts, tags, compute):
+    """Return the cached result of ``compute()`` for ``parts``, calling it
+    only if one of ``tags`` has been invalidated since it was stored.
+
+    For data a view needs whose cache key depends on more than its URL
+    kwargs, which ``cache_page_by_tags`` can't express.
+    """
+    key = _versioned_key('value', name, parts, tags)
+    cache = page_cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'SPORTS_PAGE_CACHE_TIMEOUT', 60 * 60 * 24))
+    return value
+
+
+def cache_page_by_tags(view_name, tags):
+    """Cache a view's successful GET responses until one of its tags is
+    invalidated.
+
+    ``tags`` is called with the view's URL kwargs and returns the tags the
+    page depends on.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            key = _versioned_key('page', view_name, kwargs.values(), tags(**kwargs))
+
+            cache = page_cache()
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    timeout = getattr(settings, 'SPORTS_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+                    cache.set(key, response, timeout)
+            return response
+        return wrapped
+    return decorator
+
+
+def freshness(querysets):
+    """``(etag, last_modified)`` for a response built from ``querysets``.
+
+    Last-Modified is the newest ``updated_at`` among them. The ETag also
+    covers each row count, so deleting a row, which leaves the newest
+    timestamp alone, still changes it.
+    """
+    parts = []
+    last_modified = None
+    for qs in querysets:
+        stats = qs.order_by().aggregate(latest=Max('updated_at'), count=Count('pk'))
+        parts.append(f"{qs.model._meta.label}:{stats['count']}:{stats['latest'] and stats['latest'].isoformat()}")
+        if stats['latest'] and (last_modified is None or stats['latest'] > last_modified):
+            last_modified = stats['latest']
+    return _digest('|'.join(parts)), last_modified
+
+
+def conditional_on(querysets, tags=None, weak=False):
+    """Answer conditional GETs for a view with ``304 Not Modified`` when the
+    rows it shows haven't changed, without running the view.
+
+    ``querysets`` is called with the view's URL kwargs, like the ``tags`` of
+    ``cache_page_by_tags``, and returns the querysets the response is built
+    from. With ``tags`` the validators are cached until one of them is
+    invalidated, so a request costs no queries. Apply it outside
+    ``cache_page_by_tags`` so a 304 skips the page cache lookup too.
+
+    ``weak`` sends a weak ETag, for views whose body can differ between
+    renders of the same rows.
+    """
+    def decorator(view):
+        def validators(request, *args, **kwargs):
+            # condition() asks for the ETag and Last-Modified separately
+            if not hasattr(request, '_sports_freshness'):
+                compute = lambda: freshness(querysets(**kwargs))
+                if tags is None:
+                    request._sports_freshness = compute()
+                else:
+                    request._sports_freshness = get_or_set_by_tags(f'freshness:{view.__name__}', kwargs.values(), tags(**kwargs), compute)
+            return request._sports_freshness
+
+        def etag(request, *args, **kwargs):
+            digest = validators(request, *args, **kwargs)[0]
+            return f'W/"{digest}"' if weak else digest
+
+        conditional = condition(
+            etag_func=etag,
+            last_modified_func=lambda request, *args, **kwargs: validators(request, *args, **kwargs)[1],
+        )(view)
+        if not iscoroutinefunction(view):
+            return conditional
+
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            # condition() calls the validators synchronously, and they use
+            # the ORM; compute them in a thread first so it finds them memoized
+            await sync_to_async(validators)(request, *args, **kwargs)
+            return await conditional(request, *args, **kwargs)
+        return wrapped
+    return decorator
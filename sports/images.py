@@ -0,0 +1,181 @@
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from django.utils import timezone
+
+
+# Bounding boxes of the derivatives generated for every uploaded photo
+RENDITIONS = {
+    'card': (400, 400),
+    'profile': (800, 800),
+    'hero': (1920, 1080),
+}
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def rendition_name(name, size, ext):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}.{size}.{ext}'
+
+
+def build_renditions(fieldfile):
+    """Write every rendition of ``fieldfile`` next to the original.
+
+    Returns the metadata stored on the model::
+
+        {'card': {'width': 400, 'height': 300,
+                  'webp': 'players/photos/x.card.webp',
+                  'jpeg': 'players/photos/x.card.jpeg'}, ...}
+    """
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name, 'rb') as f:
+        source = Image.open(f)
+        source = ImageOps.exif_transpose(source)
+        source.load()
+
+    renditions = {}
+    by_dimensions = {}
+    for size, box in RENDITIONS.items():
+        img = source.copy()
+        img.thumbnail(box)  # Maintain aspect ratio, never upscales
+        if img.size in by_dimensions:
+            # Small originals come out identical for the larger boxes
+            renditions[size] = by_dimensions[img.size]
+            continue
+        entry = by_dimensions[img.size] = {'width': img.width, 'height': img.height}
+        for ext, options in FORMATS.items():
+            out = img
+            if ext == 'jpeg' and out.mode not in ('RGB', 'L'):
+                out = out.convert('RGB')
+            elif out.mode not in ('RGB', 'RGBA', 'L'):
+                out = out.convert('RGBA')
+            buf = BytesIO()
+            out.save(buf, **options)
+
+            name = rendition_name(fieldfile.name, size, ext)
+            if storage.exists(name):
+                storage.delete(name)
+            entry[ext] = storage.save(name, ContentFile(buf.getvalue()))
+        renditions[size] = entry
+    return renditions
+
+
+def delete_renditions(storage, renditions):
+    for entry in renditions.values():
+        for ext in FORMATS:
+            if entry.get(ext):
+                storage.delete(entry[ext])
+
+
+def update_renditions(model_label, pk):
+    """(Re)build the renditions of one instance and record them.
+
+    The update is conditional on the source photo being unchanged, so a
+    slow build can't overwrite the renditions of a newer upload.
+    """
+    from .cache import invalidate_all
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    fieldfile = getattr(instance, model.rendition_field)
+    renditions = build_renditions(fieldfile) if fieldfile else {}
+    with transaction.atomic():
+        # New renditions change the srcset, so they count as a modification
+        model.objects.filter(pk=pk, **{model.rendition_field: fieldfile.name}).update(renditions=renditions, updated_at=timezone.now())
+        invalidate_all()
+
+
+def schedule_renditions(instance):
+    """Queue the rendition build for a background worker."""
+    from .jobs import enqueue
+
+    enqueue('sports.images.update_renditions', instance._meta.label, instance.pk)
+
+
+def schedule_renditions_many(instances):
+    """Queue rendition builds for instances whose image was changed with
+    ``bulk_update`` (which bypasses ``save``)."""
+    from .jobs import enqueue_many
+
+    enqueue_many('sports.images.update_renditions', [(i._meta.label, i.pk) for i in instances])
+
+
+class ImageRenditions(models.Model):
+    """Responsive derivatives of the model's ``rendition_field`` image.
+
+    Saving only schedules the derivative build when the image actually
+    changed; the original upload is stored untouched.
+    """
+    rendition_field = 'photo'
+
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.rendition_field in field_names:
+            instance._rendition_source = getattr(instance, cls.rendition_field).name
+        return instance
+
+    def save(self, *args, **kwargs):
+        source = getattr(self, self.rendition_field).name or ''
+        changed = source != (getattr(self, '_rendition_source', None) or '')
+        if changed:
+            stale, self.renditions = self.renditions, {}
+            if stale:
+                old_source = self._rendition_source
+                transaction.on_commit(lambda: self._delete_stale_renditions(old_source, stale))
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and self.rendition_field in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'renditions'}
+        super().save(*args, **kwargs)
+        self._rendition_source = source
+        if changed and source:
+            schedule_renditions(self)
+
+    def _delete_stale_renditions(self, old_source, stale):
+        # Content-addressed photos (and so their renditions) can be shared
+        # by several rows; only delete them once nothing uses them.
+        if not type(self).objects.filter(**{self.rendition_field: old_source}).exists():
+            delete_renditions(getattr(self, self.rendition_field).storage, stale)
+
+    def rendition_url(self, size, ext='jpeg'):
+        entry = self.renditions.get(size)
+        if entry and entry.get(ext):
+            return getattr(self, self.rendition_field).storage.url(entry[ext])
+        image = getattr(self, self.rendition_field)
+        return image.url if image else ''
+
+    def srcset(self, ext):
+        storage = getattr(self, self.rendition_field).storage
+        candidates = {}
+        for entry in self.renditions.values():
+            if entry.get(ext):
+                candidates.setdefault(entry['width'], storage.url(entry[ext]))
+        return ', '.join(f'{url} {width}w' for width, url in sorted(candidates.items()))
+
+    # Template-friendly shorthands
+    @property
+    def webp_srcset(self):
+        return self.srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('jpeg')
+
+    @property
+    def card_url(self):
+        return self.rendition_url('card')
@@ -0,0 +1,381 @@
+import csv
+import datetime
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_date, parse_time
+from django.core.files import File
+from django.core.files.storage import storages
+from openpyxl import load_workbook
+from .images import schedule_renditions
+from .models import Player, PhotoSource
+from .storage import hash_file
+
+
+def as_str(v):
+    return None if v is None else str(v).strip()
+
+
+def as_int(v):
+    if v is None:
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        pass
+    # CSV and JSON Lines give "9.0" where a workbook gives the float 9.0
+    try:
+        f = float(v)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return int(f) if f.is_integer() else None
+
+
+def as_bool(v):
+    if v is None:
+        return False
+    if isinstance(v, bool):
+        return v
+    return str(v).strip().lower() in ('1', 'true', 'yes', 'y', 't')
+
+
+def as_year(v):
+    # Player.year is text: keep "9th" as written but store 9.0 from a
+    # numeric cell as "9", never None
+    n = as_int(v)
+    if n is not None:
+        return str(n)
+    return as_str(v) or ''
+
+
+def as_date(v):
+    if v is None or v == '':
+        return None
+    if isinstance(v, datetime.datetime):
+        return v.date()
+    if isinstance(v, datetime.date):
+        return v
+    try:
+        return parse_date(str(v).strip()[:10])
+    except ValueError:
+        return None
+
+
+def as_time(v):
+    if v is None or v == '':
+        return None
+    if isinstance(v, datetime.datetime):
+        return v.time()
+    if isinstance(v, datetime.time):
+        return v
+    try:
+        return parse_time(str(v).strip())
+    except ValueError:
+        return None
+
+
+def normalize_player_row(row, idx):
+    """Map a raw sheet row (header -> value) onto player fields, accepting
+    the column aliases coaches use. Returns ``None`` when the row has
+    neither a first nor a last name."""
+    first = as_str(row.get('first_name') or row.get('First name') or row.get('firstname'))
+    last = as_str(row.get('last_name') or row.get('Last name') or row.get('lastname'))
+    if not first and not last:
+        return None
+    team_raw = as_str(row.get('team') or row.get('Team')) or 'Unassigned'
+    return {
+        'idx': idx,
+        'first_name': first or '',
+        'last_name': last or '',
+        'team_name': team_raw,
+        'position': as_str(row.get('position')) or '',
+        'year': as_year(row.get('year_group') or row.get('year')),
+        'is_captain': as_bool(row.get('is_captain') or row.get('captain')),
+        'shirt_number': as_int(row.get('kit_number') or row.get('shirt_number') or row.get('kit')),
+        'quote': as_str(row.get('quote') or row.get('player_quote') or row.get('Quote')),
+        'photo_raw': row.get('photo') or row.get('photo_filename') or row.get('Photo')
+    }
+
+
+ROW_FINGERPRINT_FIELDS = ('team_name', 'first_name', 'last_name', 'position', 'year', 'is_captain', 'shirt_number', 'quote', 'photo_raw')
+
+
+def row_fingerprint(row, photo_path=None, **extra):
+    """Hash a normalised row together with the size and mtime of its photo
+    file, so editing the row or replacing the photo changes the hash.
+    ``extra`` mixes in import options that change the outcome."""
+    photo = None
+    if photo_path:
+        st = os.stat(photo_path)
+        photo = [photo_path, st.st_size, st.st_mtime_ns]
+    payload = [[row[f] for f in ROW_FINGERPRINT_FIELDS], photo, sorted(extra.items())]
+    return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
+
+
+def normalize_game_row(row, idx):
+    """Map a raw fixtures/results row onto game fields. Returns ``None``
+    when the row has no team, opposition or date."""
+    team = as_str(row.get('team') or row.get('Team') or row.get('dcb_team'))
+    opposition = as_str(row.get('opposition') or row.get('Opposition') or row.get('opponent'))
+    date = as_date(row.get('date') or row.get('Date'))
+    if not team or not opposition or not date:
+        return None
+    dcb_score = as_int(row.get('dcb_score') if row.get('dcb_score') is not None else row.get('score'))
+    opp_score = as_int(row.get('opp_score') if row.get('opp_score') is not None else row.get('opponent_score'))
+    finished = row.get('is_finished') if row.get('is_finished') is not None else row.get('finished')
+    return {
+        'idx': idx,
+        'team_name': team,
+        'sport': as_str(row.get('sport') or row.get('Sport')) or '',
+        'level': as_str(row.get('level') or row.get('Level')) or '',
+        'opposition': opposition,
+        'date': date,
+        'time': as_time(row.get('time') or row.get('Time')) or datetime.time(0, 0),
+        'location': as_str(row.get('location') or row.get('Location') or row.get('venue')) or '',
+        'dcb_score': dcb_score or 0,
+        'opp_score': opp_score or 0,
+        # A row with a score is a result unless it says otherwise
+        'is_finished': as_bool(finished) if finished is not None else (dcb_score is not None and opp_score is not None),
+    }
+
+
+def iter_excel_rows(path, sheet=0):
+    """Yield ``(row_number, {header: value})`` from a workbook one row at a
+    time.
+
+    The workbook is opened read-only, so openpyxl streams rows from the file
+    instead of building the whole sheet in memory. ``sheet`` is an index or
+    a sheet name.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if isinstance(sheet, int) or str(sheet).isdigit():
+            worksheet = workbook.worksheets[int(sheet)]
+        else:
+            worksheet = workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        headers = [as_str(h) for h in headers]
+        for idx, values in enumerate(rows, start=1):
+            if values is None or all(v is None or v == '' for v in values):
+                continue
+            yield idx, {h: v for h, v in zip(headers, values) if h}
+    finally:
+        workbook.close()
+
+
+def _blank_to_none(row):
+    return {k.strip(): (None if v == '' else v) for k, v in row.items() if k and k.strip()}
+
+
+def iter_csv_rows(path):
+    """Yield ``(row_number, {header: value})`` from a CSV file with a header
+    row, reading one line at a time. Empty cells come back as ``None``, as
+    they do from a workbook."""
+    # utf-8-sig drops the byte order mark Excel puts on CSV exports
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for idx, row in enumerate(csv.DictReader(f), start=1):
+            row = _blank_to_none(row)
+            if any(v is not None for v in row.values()):
+                yield idx, row
+
+
+def iter_jsonl_rows(path):
+    """Yield ``(row_number, {key: value})`` from a JSON Lines file, one
+    object per line."""
+    with open(path, encoding='utf-8') as f:
+        for idx, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Line {idx} is not valid JSON: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {idx} is not a JSON object")
+            yield idx, _blank_to_none(row)
+
+
+TEXT_EXTENSIONS = ('.csv', '.jsonl', '.ndjson')
+
+
+def iter_rows(path, sheet=0):
+    """Stream rows from ``path``, picking the reader from its extension:
+    ``.csv``, ``.jsonl``/``.ndjson``, otherwise a workbook. ``sheet`` only
+    applies to workbooks."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return iter_csv_rows(path)
+    if ext in ('.jsonl', '.ndjson'):
+        return iter_jsonl_rows(path)
+    return iter_excel_rows(path, sheet)
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items without materialising
+    ``iterable``."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_photo(source_path, upload_to, photo_name):
+    """Copy an image into MEDIA_ROOT/``upload_to``.
+
+    Returns ``(name, copied)``: the name to store on the ImageField and
+    whether anything was written.
+
+    The file is copied as-is rather than opened and re-saved, preserving the
+    original size and format.
+    """
+    destination_path = os.path.join(settings.MEDIA_ROOT, upload_to, photo_name)
+    # copy2 keeps the mtime, so a same-size same-mtime destination is the
+    # copy made by a previous import
+    copied = not (os.path.exists(destination_path) and filecmp.cmp(source_path, destination_path, shallow=True))
+    if copied:
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        shutil.copy2(source_path, destination_path)
+    # Forward slashes so the name works in URLs
+    return os.path.relpath(destination_path, settings.MEDIA_ROOT).replace('\\', '/'), copied
+
+
+class PhotoLocator:
+    """Finds the source file for a photo named in a sheet.
+
+    Looks in ``<media_subdir>/<team>/``, ``<media_subdir>/`` and the media
+    root, in that order. Each directory is listed once and kept in memory,
+    so resolving thousands of rows costs a handful of ``scandir`` calls
+    instead of several ``exists`` probes per row.
+    """
+
+    def __init__(self, media_subdir):
+        self.media_subdir = media_subdir
+        self.listings = {}
+
+    def _listing(self, directory):
+        if directory not in self.listings:
+            try:
+                with os.scandir(directory) as entries:
+                    self.listings[directory] = {e.name for e in entries if e.is_file()}
+            except OSError:
+                self.listings[directory] = set()
+        return self.listings[directory]
+
+    def find(self, photo_name, team_name=None):
+        if not photo_name:
+            return None
+        pn = str(photo_name).strip()
+        candidates = []
+        if team_name:
+            candidates.append(os.path.join(settings.MEDIA_ROOT, self.media_subdir, team_name, pn))
+        candidates.append(os.path.join(settings.MEDIA_ROOT, self.media_subdir, pn))
+        candidates.append(os.path.join(settings.MEDIA_ROOT, pn))
+        for path in candidates:
+            directory, name = os.path.split(path)
+            if name in self._listing(directory):
+                return path
+        return None
+
+    def destination_name(self, path):
+        """Name to copy a found photo to under the ImageField's upload_to.
+
+        Keeps the team folder, so ``<team A>/1.jpg`` and ``<team B>/1.jpg``
+        are stored as two files instead of racing to overwrite one.
+        """
+        relative = os.path.relpath(path, os.path.join(settings.MEDIA_ROOT, self.media_subdir))
+        if relative.startswith(os.pardir):
+            return os.path.basename(path)
+        return relative.replace('\\', '/')
+
+
+def attach_player_photo(player_pk, source_path, destination_name=None, content_addressed=False):
+    """Background job: copy a photo in and attach it to a player.
+
+    ``destination_name`` is where to copy it under upload_to, see
+    ``PhotoLocator.destination_name``; it defaults to the file name. The
+    file is copied before the transaction that records it opens.
+    """
+    player = Player.objects.get(pk=player_pk)
+    photo_name = os.path.basename(source_path)
+    if content_addressed:
+        ingester = PhotoIngester([source_path])
+        stored_name = ingester.ingest(source_path)
+        with transaction.atomic():
+            player.photo.name = stored_name
+            player.photo_original_name = photo_name
+            player.save(update_fields=['photo', 'photo_original_name', 'updated_at'])
+            ingester.save()
+    else:
+        old_name = player.photo.name
+        stored_name, copied = copy_photo(source_path, player.photo.field.upload_to, destination_name or photo_name)
+        with transaction.atomic():
+            player.photo.name = stored_name
+            player.save(update_fields=['photo', 'updated_at'])
+            if copied and stored_name == old_name:
+                # Same name, new content: save() can't tell the renditions are stale
+                schedule_renditions(player)
+
+
+class PhotoIngester:
+    """Copies source photos into content-addressed storage.
+
+    Hashes are remembered in ``PhotoSource`` keyed by source path, so a
+    source whose size and mtime haven't changed since the last import costs
+    one ``stat`` and no reads or writes.
+    """
+
+    def __init__(self, paths, storage=None):
+        self.storage = storage or storages['content_addressed']
+        self.known = {}
+        for batch in batched(set(paths), 500):
+            self.known.update({s.path: s for s in PhotoSource.objects.filter(path__in=batch)})
+        self.changed = {}
+        self.copied = 0
+        # ingest() is called from the import's thread pool
+        self.lock = threading.Lock()
+
+    def ingest(self, path):
+        """Return the storage name for the file at ``path``, storing it if
+        its content isn't stored yet."""
+        st = os.stat(path)
+        source = self.known.get(path)
+        if (source and source.size == st.st_size and source.mtime_ns == st.st_mtime_ns
+                and self.storage.exists(source.stored_name)):
+            return source.stored_name
+
+        digest = hash_file(path)
+        name = self.storage.name_for(digest, path)
+        if not self.storage.exists(name):
+            with open(path, 'rb') as f:
+                name = self.storage.save_with_digest(digest, path, File(f))
+            with self.lock:
+                self.copied += 1
+
+        with self.lock:
+            if source is None:
+                source = self.known[path] = PhotoSource(path=path)
+            source.size, source.mtime_ns = st.st_size, st.st_mtime_ns
+            source.sha256, source.stored_name = digest, name
+            self.changed[path] = source
+        return name
+
+    def save(self):
+        """Record the hashes computed during this run."""
+        new = [s for s in self.changed.values() if s.pk is None]
+        old = [s for s in self.changed.values() if s.pk is not None]
+        PhotoSource.objects.bulk_create(new, batch_size=500)
+        PhotoSource.objects.bulk_update(old, ['size', 'mtime_ns', 'sha256', 'stored_name'], batch_size=500)
+        self.changed = {}
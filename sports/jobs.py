@@ -0,0 +1,108 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+VISIBILITY_TIMEOUT = 300
+RETRY_DELAY = 10
+
+
+def enqueue(task, *args, **kwargs):
+    """Queue ``task`` (a dotted path to a function) to run in a worker.
+
+    Arguments must be JSON serialisable. Enqueueing inside a transaction
+    means the job only becomes visible to workers if that transaction
+    commits.
+    """
+    import_string(task)  # fail fast on typos rather than in the worker
+    return Job.objects.create(task=task, args=list(args), kwargs=kwargs, run_at=timezone.now())
+
+
+def enqueue_many(task, arg_lists, **kwargs):
+    """Queue one ``task`` job per argument list with a single bulk insert;
+    ``kwargs`` are passed to every call."""
+    import_string(task)
+    now = timezone.now()
+    return Job.objects.bulk_create(
+        [Job(task=task, args=list(args), kwargs=kwargs, run_at=now) for args in arg_lists],
+        batch_size=500,
+    )
+
+
+def _claimable(now):
+    return (
+        Q(status='queued', run_at__lte=now)
+        # A worker that died mid-job leaves it running with an expired lock
+        | Q(status='running', locked_until__lt=now)
+    )
+
+
+def claim(worker_id, visibility_timeout=VISIBILITY_TIMEOUT, batch=10):
+    """Lock the next runnable job for ``worker_id`` and return it, or ``None``.
+
+    Claiming is a conditional UPDATE, so concurrent workers (threads or
+    processes) never run the same job while its lock is valid.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(_claimable(now)).order_by('run_at', 'pk').values_list('pk', flat=True)[:batch]
+    for pk in candidates:
+        claimed = Job.objects.filter(_claimable(now), pk=pk).update(
+            status='running',
+            attempts=F('attempts') + 1,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+        )
+        if not claimed:
+            continue
+        job = Job.objects.get(pk=pk)
+        if job.attempts > job.max_attempts:
+            # Abandoned more often than it may be retried, e.g. it keeps
+            # killing its worker
+            Job.objects.filter(pk=pk).update(status='failed', finished_at=now, locked_by='', locked_until=None)
+            continue
+        return job
+    return None
+
+
+def run(job):
+    """Run a claimed job, then mark it done or schedule a retry.
+
+    The task runs outside a transaction. With the IMMEDIATE transaction mode
+    of the SQLite profile an open transaction holds the database write lock,
+    so tasks do their slow work (image encoding, file copies) first and wrap
+    only their final writes in ``transaction.atomic()``.
+    """
+    try:
+        func = import_string(job.task)
+        func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    # Only record the outcome while we still own the lock; if it expired the
+    # job has been handed to another worker, which will record its own.
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=job.status,
+        run_at=job.run_at,
+        last_error=job.last_error,
+        finished_at=job.finished_at,
+        locked_by='',
+        locked_until=None,
+    )
+    return job.status
@@ -0,0 +1,81 @@
+import random
+
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from .cache import get_or_set_by_tags
+from .models import Team, Player, Game
+from .pagination import GAME_ORDERING, game_cursor
+
+
+ROSTER_GAMES = 2
+PROFILE_TEAMMATES = 4
+
+
+def team_queryset():
+    """Teams with their players and coaches prefetched.
+
+    Combined with the memoized accessors on ``Team`` this lets templates call
+    ``get_captain``/``get_coach``/``get_student_coach`` freely without issuing
+    extra queries.
+    """
+    return Team.objects.prefetch_related(
+        Prefetch('players', queryset=Player.objects.order_by('shirt_number', 'last_name', 'first_name')),
+        'coaches',
+    )
+
+
+def load_roster(team_name):
+    """Fetch everything the roster page needs in a fixed number of queries.
+
+    One query each for the team, its players, its coaches, the latest results
+    and the next upcomings — five in total, however large the roster is.
+    """
+    team = get_object_or_404(team_queryset(), name=team_name)
+
+    games = Game.objects.filter(dcb_team=team).select_related('dcb_team', 'opposition')
+    results = list(games.order_by(*GAME_ORDERING)[:ROSTER_GAMES])
+    upcomings = list(games.filter(is_finished=False).order_by(*GAME_ORDERING)[:ROSTER_GAMES])
+
+    captain = team.get_captain()
+    players = [p for p in team.players.all() if not p.is_captain]
+
+    return {
+        'team': team,
+        'players': players,
+        'captain': captain,
+        'results': results,
+        'upcomings': upcomings,
+        # Where the "show more" buttons continue from
+        'results_cursor': game_cursor(results[-1]) if results else '',
+        'upcomings_cursor': game_cursor(upcomings[-1]) if upcomings else '',
+    }
+
+
+def team_player_pks(team):
+    """The pks of a team's players, cached until the roster changes."""
+    return get_or_set_by_tags(
+        'team_player_pks', [team.pk], ['rosters', f'team:{team.name}'],
+        lambda: list(Player.objects.filter(team=team).values_list('pk', flat=True)),
+    )
+
+
+def load_profile(team_name, pk):
+    """Fetch the profile page's player and a random sample of teammates.
+
+    The player and team come from one joined query, which also checks the
+    player is on that team. Teammates are sampled from the cached pk list
+    rather than with ``order_by('?')``, which makes the database sort the
+    whole team on every view; only the sampled rows are then fetched.
+    """
+    player = get_object_or_404(Player.objects.select_related('team'), pk=pk, team__name=team_name)
+
+    pks = team_player_pks(player.team)
+    # One extra in case the sample includes the player themselves
+    sample = random.sample(pks, min(PROFILE_TEAMMATES + 1, len(pks)))
+    sample = [mate_pk for mate_pk in sample if mate_pk != player.pk][:PROFILE_TEAMMATES]
+    teammates = sorted(Player.objects.filter(pk__in=sample), key=lambda mate: sample.index(mate.pk))
+
+    return {
+        'player': player,
+        'teamates': teammates,
+    }
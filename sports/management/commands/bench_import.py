@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from openpyxl import Workbook
+from PIL import Image
+
+from sports.models import Team
+
+
+# mode -> (command, flags)
+MODES = {
+    'bulk': ('import_excel', ['--bulk']),
+    'default': ('import_excel', []),
+    'skip-images': ('import_excel', ['--skip-images']),
+    'dry-run': ('import_excel', ['--dry-run']),
+    # import_players on the same sheet. It only links photos already in
+    # players/photos/<folder>/ and never creates teams, so the case sets
+    # both up before timing and measures row resolution and the bulk writes
+    'import-players': ('import_players', []),
+}
+PHOTO_SUBDIR = 'bench_photos'
+TEAMS = 8
+
+
+def make_workbook(path, rows, photos=0, teams=TEAMS):
+    """Write a player sheet with ``rows`` rows spread over ``teams`` teams.
+
+    With ``photos`` every row names one of that many photo files, so players
+    share photos the way real squads share a default picture.
+    """
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(['team', 'first_name', 'last_name', 'position', 'year_group', 'is_captain', 'kit_number', 'Quote', 'photo'])
+    for i in range(rows):
+        worksheet.append([
+            f'Bench team {i % teams}',
+            f'First{i}',
+            f'Last{i}',
+            ('Setter', 'Libero', 'Outside', 'Middle')[i % 4],
+            9 + i % 4,
+            i < teams,
+            i % 99,
+            f'Quote {i}',
+            f'photo_{i % photos}.jpg' if photos else None,
+        ])
+    workbook.save(path)
+
+
+def make_photos(directory, count):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        Image.new('RGB', (64, 64), ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256)).save(os.path.join(directory, f'photo_{i}.jpg'))
+
+
+def peak_rss_kb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class Command(BaseCommand):
+    help = "Benchmark import_excel and import_players on generated workbooks and print the results as JSON. Options: --sizes, --modes, --photos, --photo-pool, --output, --keep"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Row counts to generate')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES), help='import_excel modes to run; import-players runs import_players on the same sheet')
+        parser.add_argument('--photos', choices=['both', 'with', 'without'], default='both', help='Whether generated sheets name photos')
+        parser.add_argument('--photo-pool', type=int, default=50, help='Distinct photo files shared by the rows of a sheet')
+        parser.add_argument('--output', '-o', help='Write the JSON here instead of stdout')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated workbooks and databases')
+        # Used by the parent process to run one case in a fresh interpreter
+        parser.add_argument('--run-case', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['run_case']:
+            self.stdout.write(json.dumps(self.run_case(json.loads(options['run_case']))))
+            return
+
+        photo_variants = {'both': [False, True], 'with': [True], 'without': [False]}[options['photos']]
+        workdir = tempfile.mkdtemp(prefix='bench_import_')
+        results = []
+        try:
+            photo_dir = os.path.join(workdir, 'photos')
+            make_photos(photo_dir, options['photo_pool'])
+            for size in options['sizes']:
+                for with_photos in photo_variants:
+                    workbook = os.path.join(workdir, f'players_{size}_{"photos" if with_photos else "plain"}.xlsx')
+                    make_workbook(workbook, size, photos=options['photo_pool'] if with_photos else 0)
+                    for mode in options['modes']:
+                        case = {
+                            'workbook': workbook,
+                            'rows': size,
+                            'photos': with_photos,
+                            'mode': mode,
+                            'photo_dir': photo_dir,
+                            'workdir': os.path.join(workdir, f'{size}_{int(with_photos)}_{mode}'),
+                        }
+                        self.stderr.write(f'{size} rows, {"with" if with_photos else "without"} photos, {mode}...')
+                        results.append(self.spawn(case))
+        finally:
+            if options['keep']:
+                self.stderr.write(f'Benchmark files kept in {workdir}')
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        report = json.dumps({
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+            },
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def spawn(self, case):
+        """Run ``case`` in a child process so peak RSS and imported modules
+        from one case don't leak into the next."""
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        proc = subprocess.run(
+            [sys.executable, manage, 'bench_import', '--run-case', json.dumps(case)],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f'Benchmark case {case["rows"]}/{case["mode"]} failed:\n{proc.stderr}')
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+    def run_case(self, case):
+        """Import one workbook into a throwaway database and media root."""
+        workdir = case['workdir']
+        media_root = os.path.join(workdir, 'media')
+        command, flags = MODES[case['mode']]
+        if command == 'import_players':
+            shutil.copytree(case['photo_dir'], os.path.join(media_root, 'players', 'photos', PHOTO_SUBDIR))
+            args = [PHOTO_SUBDIR, '--file', case['workbook']] + flags
+        else:
+            shutil.copytree(case['photo_dir'], os.path.join(media_root, PHOTO_SUBDIR))
+            args = ['-f', case['workbook'], '-m', PHOTO_SUBDIR] + flags
+
+        # Nothing has connected yet, so pointing the connection elsewhere is
+        # enough to keep the real database out of it
+        connection.settings_dict['NAME'] = os.path.join(workdir, 'db.sqlite3')
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            settings.SPORTS_PAGE_CACHE: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+        }
+        with override_settings(MEDIA_ROOT=media_root, CACHES=caches):
+            call_command('migrate', verbosity=0, interactive=False)
+            if command == 'import_players':
+                # import_excel creates the sheet's teams, import_players only
+                # looks them up
+                Team.objects.bulk_create([
+                    Team(season='1', name=f'Bench team {i}', sport='VB', level='BV', honors='') for i in range(TEAMS)
+                ])
+            baseline_rss = peak_rss_kb()
+
+            queries = 0
+
+            def count_queries(execute, sql, params, many, context):
+                nonlocal queries
+                queries += 1
+                return execute(sql, params, many, context)
+
+            out = StringIO()
+            with connection.execute_wrapper(count_queries):
+                start = time.perf_counter()
+                call_command(command, *args, stdout=out)
+                elapsed = time.perf_counter() - start
+
+        return {
+            'command': command,
+            'mode': case['mode'],
+            'flags': flags,
+            'rows': case['rows'],
+            'photos': case['photos'],
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(case['rows'] / elapsed, 1) if elapsed else None,
+            'queries': queries,
+            'peak_rss_kb': peak_rss_kb(),
+            'baseline_rss_kb': baseline_rss,
+            'summary': out.getvalue().strip().splitlines()[-1] if out.getvalue().strip() else '',
+        }
@@ -0,0 +1,102 @@
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django_ratelimit.core import get_usage, is_ratelimited
+
+
+BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-ratelimit'},
+    'sqlite': {'BACKEND': 'sports.sqlite_cache.SQLiteCache'},
+}
+GROUP = 'bench_ratelimit'
+# High enough never to block; a day-long window so a run doesn't straddle two
+RATE = f'{10 ** 9}/d'
+
+
+def run_worker(args):
+    """Make ``checks`` rate limit checks from one address and return their
+    timings in nanoseconds, plus the count this process sees afterwards."""
+    checks, address = args
+    request = RequestFactory().get('/', REMOTE_ADDR=address)
+    timings = []
+    for _ in range(checks):
+        start = time.perf_counter_ns()
+        is_ratelimited(request, group=GROUP, key='ip', rate=RATE, increment=True)
+        timings.append(time.perf_counter_ns() - start)
+    usage = get_usage(request, group=GROUP, key='ip', rate=RATE)
+    return timings, usage['count']
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark django_ratelimit checks against each cache backend from several processes and print the results as JSON. Options: --backends, --workers, --checks, --output"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS), help='Cache backends to compare')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='Process counts to run')
+        parser.add_argument('--checks', type=int, default=5000, help='Checks made by each process')
+        parser.add_argument('--output', '-o', help='Write the JSON here instead of stdout')
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='bench_ratelimit_')
+        results = []
+        try:
+            for backend in options['backends']:
+                for workers in options['workers']:
+                    self.stderr.write(f'{backend}, {workers} worker(s)...')
+                    config = dict(BACKENDS[backend], LOCATION=BACKENDS[backend].get('LOCATION') or os.path.join(workdir, f'{workers}.sqlite3'))
+                    results.append(self.run(backend, config, workers, options['checks'], address=f'10.0.{len(results)}.1'))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = json.dumps({
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+            },
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run(self, backend, config, workers, checks, address):
+        caches = dict(settings.CACHES, bench=config)
+        with override_settings(CACHES=caches, RATELIMIT_USE_CACHE='bench', RATELIMIT_ENABLE=True):
+            # Forked workers inherit the overridden settings
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                started = time.perf_counter()
+                outcomes = pool.map(run_worker, [(checks, address)] * workers)
+                elapsed = time.perf_counter() - started
+
+        timings = sorted(t for worker_timings, _ in outcomes for t in worker_timings)
+        return {
+            'backend': backend,
+            'workers': workers,
+            'checks': workers * checks,
+            'checks_per_second': round(workers * checks / elapsed),
+            'mean_us': round(sum(timings) / len(timings) / 1000, 1),
+            'p50_us': round(percentile(timings, 0.5) / 1000, 1),
+            'p99_us': round(percentile(timings, 0.99) / 1000, 1),
+            # A shared backend counts every check; one per process only its own
+            'counted': max(count for _, count in outcomes),
+        }
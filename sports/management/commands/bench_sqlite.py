@@ -0,0 +1,178 @@
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test.utils import override_settings
+
+from sports import standings
+from sports.models import Game, Opposition, Team, TeamSeasonStats
+from sports.pagination import GAME_ORDERING
+
+
+# 'baseline' is a bare sqlite3 DATABASES entry; 'production' is the one in
+# settings, with its pragmas
+PROFILES = ['baseline', 'production']
+TEAMS = 8
+
+
+def profile_settings(profile):
+    """``(CONN_MAX_AGE, OPTIONS, pragmas)`` for ``profile``."""
+    if profile == 'baseline':
+        return 0, {}, {}
+    default = settings.DATABASES['default']
+    return default.get('CONN_MAX_AGE', 0), dict(default.get('OPTIONS', {})), dict(settings.SPORTS_SQLITE_PRAGMAS)
+
+
+def seed(games):
+    teams = Team.objects.bulk_create([
+        Team(season='1', name=f'Bench team {i}', sport='VB', level='BV', honors='') for i in range(TEAMS)
+    ])
+    oppositions = Opposition.objects.bulk_create([Opposition(name=f'Bench opposition {i}') for i in range(TEAMS)])
+    start = datetime.date(2025, 1, 1)
+    Game.objects.bulk_create([
+        Game(
+            dcb_team=teams[i % TEAMS], opposition=oppositions[i % TEAMS - 1],
+            dcb_score=i % 4, opp_score=i % 3, location='Bench',
+            date=start + datetime.timedelta(days=i // TEAMS), time=datetime.time(10),
+            is_finished=i % 2 == 0,
+        )
+        for i in range(games)
+    ])
+    standings.rebuild()
+
+
+def run_worker(args):
+    """Read the roster and standings queries, or update scores, until
+    ``deadline``; every operation is followed by the end-of-request
+    connection handling Django does."""
+    role, deadline, worker_seed = args
+    rng = random.Random(worker_seed)
+    team_ids = list(Team.objects.values_list('pk', flat=True))
+    game_ids = list(Game.objects.values_list('pk', flat=True))
+    close_old_connections()
+
+    timings, errors = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        try:
+            if role == 'read':
+                team_id = rng.choice(team_ids)
+                list(Game.objects.filter(dcb_team_id=team_id).select_related('dcb_team', 'opposition').order_by(*GAME_ORDERING)[:10])
+                list(TeamSeasonStats.objects.filter(sport='VB', season='1').select_related('team'))
+            else:
+                with transaction.atomic():
+                    game = Game.objects.get(pk=rng.choice(game_ids))
+                    game.dcb_score += 1
+                    game.is_finished = True
+                    game.save()
+        except OperationalError:
+            # "database is locked": the busy timeout ran out, or a deferred
+            # transaction could not upgrade its read lock
+            errors += 1
+        else:
+            timings.append(time.perf_counter_ns() - start)
+        close_old_connections()
+    connection.close()
+    return role, timings, errors
+
+
+def summarize(timings, errors, seconds):
+    timings = sorted(timings)
+    at = lambda fraction: round(timings[min(len(timings) - 1, int(len(timings) * fraction))] / 1e6, 2) if timings else None
+    return {
+        'operations': len(timings),
+        'per_second': round(len(timings) / seconds, 1),
+        'p50_ms': at(0.5),
+        'p99_ms': at(0.99),
+        'errors': errors,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark SQLite read throughput while scores are being updated, for a bare and the production database profile, and print the results as JSON. Options: --profiles, --readers, --writers, --seconds, --games, --output"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=PROFILES, help='Database profiles to compare')
+        parser.add_argument('--readers', type=int, default=4, help='Reading processes')
+        parser.add_argument('--writers', type=int, default=2, help='Processes updating scores')
+        parser.add_argument('--seconds', type=float, default=5, help='How long each profile runs')
+        parser.add_argument('--games', type=int, default=2000, help='Games to seed')
+        parser.add_argument('--output', '-o', help='Write the JSON here instead of stdout')
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='bench_sqlite_')
+        # Read before the first run repoints the connection, whose
+        # settings_dict is the DATABASES entry itself
+        profiles = {profile: profile_settings(profile) for profile in options['profiles']}
+        results = []
+        try:
+            for profile, profile_options in profiles.items():
+                self.stderr.write(f'{profile}...')
+                results.append(self.run(profile, profile_options, os.path.join(workdir, f'{profile}.sqlite3'), options))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = json.dumps({
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+            },
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run(self, profile, profile_options, path, options):
+        conn_max_age, db_options, pragmas = profile_options
+        # Point the connection at a throwaway file; the real database is
+        # never opened
+        connection.close()
+        connection.settings_dict.update(NAME=path, CONN_MAX_AGE=conn_max_age, OPTIONS=db_options)
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            settings.SPORTS_PAGE_CACHE: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'},
+        }
+        with override_settings(CACHES=caches, SPORTS_SQLITE_PRAGMAS=pragmas):
+            call_command('migrate', verbosity=0, interactive=False)
+            seed(options['games'])
+            journal_mode = connection.cursor().execute('PRAGMA journal_mode').fetchone()[0]
+            # Forked workers must open their own connections
+            connections.close_all()
+
+            deadline = time.perf_counter() + options['seconds']
+            roles = ['read'] * options['readers'] + ['write'] * options['writers']
+            with multiprocessing.get_context('fork').Pool(len(roles)) as pool:
+                outcomes = pool.map(run_worker, [(role, deadline, i) for i, role in enumerate(roles)])
+
+        def combined(role):
+            timings = [t for r, worker_timings, _ in outcomes if r == role for t in worker_timings]
+            return summarize(timings, sum(e for r, _, e in outcomes if r == role), options['seconds'])
+
+        return {
+            'profile': profile,
+            'journal_mode': journal_mode,
+            'options': db_options,
+            'conn_max_age': conn_max_age,
+            'readers': options['readers'],
+            'writers': options['writers'],
+            'reads': combined('read'),
+            'writes': combined('write'),
+        }
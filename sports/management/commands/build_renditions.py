@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from sports.models import Team, Coach, Player, Event
+from sports.images import update_renditions
+
+
+class Command(BaseCommand):
+    help = "Build responsive image renditions for photos that don't have them yet. Options: --force"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild renditions that already exist')
+
+    def handle(self, *args, **options):
+        force = options['force']
+        built = failed = 0
+
+        for model in (Team, Coach, Player, Event):
+            qs = model.objects.exclude(**{model.rendition_field: ''}).exclude(**{f'{model.rendition_field}__isnull': True})
+            if not force:
+                qs = qs.filter(renditions={})
+            for pk in qs.values_list('pk', flat=True).iterator():
+                try:
+                    update_renditions(model._meta.label, pk)
+                    built += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"Failed to build renditions for {model.__name__} {pk}: {e}"))
+
+        self.stdout.write(self.style.SUCCESS(f"Renditions built for {built} images, {failed} failed"))
@@ -1,132 +1,182 @@
 # ...existing code...
 from django.core.management.base import BaseCommand
-from django.core.files.uploadedfile import SimpleUploadedFile
 import pandas as pd
-from sports.models import Player, Team
-from django.conf import settings
+from sports.models import ImportManifest, Player, Team
+from sports import search
+from sports.cache import invalidate_all
+from sports.importing import TEXT_EXTENSIONS, PhotoIngester, PhotoLocator, batched, copy_photo, iter_rows, normalize_player_row, row_fingerprint
+from sports.jobs import enqueue_many
+from sports.images import schedule_renditions_many
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 from django.db import transaction
-from django.db.models import Q
-import shutil # Import shutil for file copying
+from django.utils import timezone
+
+# Fields an import may change on an existing player
+UPSERT_FIELDS = ['position', 'year', 'is_captain', 'shirt_number', 'quote']
+
 
 class Command(BaseCommand):
-    help = "Faster Excel import with bulk ops. Options: --file, --sheet, --media-subdir, --dry-run, --skip-images, --bulk, --batch-size"
+    help = "Faster Excel, CSV and JSON Lines import with bulk ops. Options: --file, --sheet, --media-subdir, --dry-run, --skip-images, --bulk, --batch-size, --stream, --content-addressed, --photo-workers, --defer-photos, --incremental, --manifest-key, --prune"
 
     def add_arguments(self, parser):
-        parser.add_argument('--file', '-f', default='data.xlsx')
+        parser.add_argument('--file', '-f', default='data.xlsx', help='.xlsx workbook, .csv, or .jsonl/.ndjson file')
         parser.add_argument('--sheet', '-s', default=0)
         parser.add_argument('--media-subdir', '-m', default='players/photos')
         parser.add_argument('--dry-run', action='store_true', help='Parse and validate only; do not write to DB or save files')
         parser.add_argument('--skip-images', action='store_true', help='Do not process or attach photos')
-        parser.add_argument('--bulk', action='store_true', help='Use bulk_create for new players and bulk_update for updates (photos still saved per-instance)')
+        parser.add_argument('--bulk', action='store_true', help='Create and update players with one upsert per batch')
         parser.add_argument('--batch-size', type=int, default=500, help='Batch size for bulk operations')
+        parser.add_argument('--stream', action='store_true', help='Read the file row by row and commit every --batch-size rows; memory stays flat however large the file is. Without it every row is held in memory and the whole file is imported in one transaction, CSV and JSON Lines included')
+        parser.add_argument('--content-addressed', action='store_true', help='Store photos by content hash, skipping files that are already stored')
+        parser.add_argument('--photo-workers', type=int, default=8, help='Threads used to copy photos in')
+        parser.add_argument('--defer-photos', action='store_true', help='Queue photo copies for run_worker instead of copying them during the import')
+        parser.add_argument('--incremental', action='store_true', help='Skip rows unchanged since the last import of this sheet, even if the player was edited since')
+        parser.add_argument('--manifest-key', help='Name the sheet is remembered under by --incremental (default: file name and sheet)')
+        parser.add_argument('--prune', action='store_true', help='With --incremental, delete players whose rows were removed from the sheet')
 
     def handle(self, *args, **options):
         filepath = options['file']
-        sheet = options['sheet']
-        media_subdir = options['media_subdir']
-        dry_run = options['dry_run']
-        skip_images = options['skip_images']
-        use_bulk = options['bulk']
-        batch_size = options['batch_size']
+        self.options = options
+        self.teams = {}  # team name -> Team, shared by all batches
+        self.locator = PhotoLocator(options['media_subdir'])
+        self.source = options['manifest_key'] or f"{os.path.basename(filepath)}:{options['sheet']}"
+        self.seen = set()  # (team, first, last) of every row, for --incremental
 
         if not os.path.exists(filepath):
-            self.stdout.write(self.style.ERROR(f"Excel file not found: {filepath}"))
+            self.stdout.write(self.style.ERROR(f"File not found: {filepath}"))
             return
 
+        totals = {'rows': 0, 'created': 0, 'updated': 0, 'photos': 0, 'unchanged': 0}
         try:
-            df = pd.read_excel(filepath, sheet_name=sheet, dtype=object)
+            if options['stream']:
+                # Each batch is validated, written and committed before the next
+                # one is read, so the first players land while the file is
+                # still being parsed
+                for rows in batched(self.read_rows(iter_rows(filepath, options['sheet'])), options['batch_size']):
+                    self.add_totals(totals, self.import_rows(rows))
+            elif os.path.splitext(filepath)[1].lower() in TEXT_EXTENSIONS:
+                # No pandas needed. The readers parse line by line, but the rows
+                # are collected so the file is imported in one transaction like
+                # a workbook; only --stream keeps memory flat
+                try:
+                    rows = list(self.read_rows(iter_rows(filepath)))
+                except (OSError, ValueError) as e:
+                    self.stdout.write(self.style.ERROR(f"Failed to read {filepath}: {e}"))
+                    return
+                if rows:
+                    self.add_totals(totals, self.import_rows(rows))
+            else:
+                try:
+                    df = pd.read_excel(filepath, sheet_name=options['sheet'], dtype=object)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"Failed to read Excel: {e}"))
+                    return
+                df = df.where(pd.notnull(df), None)
+                rows = list(self.read_rows((idx + 1, row) for idx, row in df.iterrows()))
+                if rows:
+                    self.add_totals(totals, self.import_rows(rows))
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Failed to read Excel: {e}"))
+            if not options['stream']:
+                raise
+            # Batches committed so far stay imported
+            self.stdout.write(self.style.ERROR(f"Import stopped after {totals['rows']} rows: {e}"))
             return
 
-        df = df.where(pd.notnull(df), None)
-
-        def as_str(v):
-            return None if v is None else str(v).strip()
-
-        def as_int(v):
-            if v is None:
-                return None
-            try:
-                if isinstance(v, float) and v.is_integer():
-                    return int(v)
-                return int(v)
-            except Exception:
-                return None
-
-        def as_bool(v):
-            if v is None:
-                return False
-            if isinstance(v, bool):
-                return v
-            return str(v).strip().lower() in ('1', 'true', 'yes', 'y', 't')
-
-        def photo_file_for(photo_name, team_name=None):
-            if not photo_name:
-                return None
-            pn = str(photo_name).strip()
-            candidates = []
-            if team_name:
-                candidates.append(os.path.join(settings.MEDIA_ROOT, media_subdir, team_name, pn))
-            candidates.append(os.path.join(settings.MEDIA_ROOT, media_subdir, pn))
-            candidates.append(os.path.join(settings.MEDIA_ROOT, pn))
-            for path in candidates:
-                if path and os.path.exists(path):
-                    return path
-            return None
+        if not totals['rows']:
+            self.stdout.write(self.style.WARNING("No valid rows to import"))
+            return
+
+        incremental = ''
+        if options['incremental']:
+            removed = self.remove_missing()
+            removed_done = "deleted" if options['prune'] else "removed from the sheet"
+            incremental = f", {totals['unchanged']} unchanged, {removed} {removed_done}"
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Dry-run: {totals['created']} to create, {totals['updated']} to update, {totals['photos']} photos to attach{incremental}"))
+            return
+
+        photos_done = "queued" if options['defer_photos'] else "attempted"
+        self.stdout.write(self.style.SUCCESS(f"Import finished: {totals['created']} created, {totals['updated']} updated, {totals['photos']} photos {photos_done}{incremental}"))
 
-        # Prepare rows
-        rows = []
-        for idx, row in df.iterrows():
-            first = as_str(row.get('first_name') or row.get('First name') or row.get('firstname'))
-            last = as_str(row.get('last_name') or row.get('Last name') or row.get('lastname'))
-            if not first and not last:
-                self.stdout.write(self.style.WARNING(f"Row {idx+1}: missing both names; skipping"))
+    @staticmethod
+    def add_totals(totals, counts):
+        for key, value in counts.items():
+            totals[key] += value
+
+    def read_rows(self, raw_rows):
+        """Normalise ``(idx, row)`` pairs, warning about and dropping rows
+        without a name."""
+        for idx, row in raw_rows:
+            r = normalize_player_row(row, idx)
+            if r is None:
+                self.stdout.write(self.style.WARNING(f"Row {idx}: missing both names; skipping"))
                 continue
-            team_raw = as_str(row.get('team') or row.get('Team')) or 'Unassigned'
-            rows.append({
-                'idx': idx + 1,
-                'first_name': first or '',
-                'last_name': last or '',
-                'team_name': team_raw,
-                'position': as_str(row.get('position')) or '',
-                'year': as_int(row.get('year_group') or row.get('year')),
-                'is_captain': as_bool(row.get('is_captain') or row.get('captain')),
-                'shirt_number': as_int(row.get('kit_number') or row.get('shirt_number') or row.get('kit')),
-                'quote': as_str(row.get('quote') or row.get('player_quote') or row.get('Quote')),
-                'photo_raw': row.get('photo') or row.get('photo_filename') or row.get('Photo')
-            })
+            yield r
 
-        if not rows:
-            self.stdout.write(self.style.WARNING("No valid rows to import"))
+    def resolve_teams(self, team_names):
+        """Fill ``self.teams`` for ``team_names``, creating missing teams
+        unless this is a dry run."""
+        wanted = set(team_names) - set(self.teams)
+        if not wanted:
             return
+        self.teams.update({t.name: t for t in Team.objects.filter(name__in=wanted)})
+        missing_teams = [name for name in wanted if name not in self.teams]
+        if missing_teams and not self.options['dry_run']:
+            Team.objects.bulk_create([Team(name=n) for n in missing_teams])
+            created = list(Team.objects.filter(name__in=missing_teams))
+            self.teams.update({t.name: t for t in created})
+            search.index(created)
+
+    def import_rows(self, rows):
+        """Create or update the players for one batch of normalised rows and
+        return the counts. Writes happen in a single transaction."""
+        dry_run = self.options['dry_run']
+        skip_images = self.options['skip_images']
+        use_bulk = self.options['bulk']
+        batch_size = self.options['batch_size']
+
+        # A player listed twice keeps the values of their last row, as a
+        # row-by-row import would
+        row_count = len(rows)
+        unique_rows = {}
+        for r in rows:
+            key = (r['team_name'], r['first_name'], r['last_name'])
+            if key in unique_rows:
+                self.stdout.write(self.style.WARNING(f"Row {r['idx']}: {r['first_name']} {r['last_name']} ({r['team_name']}) is listed more than once; using this row"))
+            unique_rows[key] = r
+        rows = list(unique_rows.values())
+
+        unchanged = 0
+        if self.options['incremental']:
+            self.seen.update(unique_rows)
+            rows = self.skip_unchanged(rows)
+            unchanged = len(unique_rows) - len(rows)
+            if not rows:
+                return {'rows': row_count, 'created': 0, 'updated': 0, 'photos': 0, 'unchanged': unchanged}
 
         # Preload teams and existing players (minimises queries)
-        team_names = set(r['team_name'] for r in rows)
-        existing_teams = {t.name: t for t in Team.objects.filter(name__in=team_names)}
-        # create missing teams if not dry-run
-        missing_teams = [name for name in team_names if name not in existing_teams]
-        if missing_teams and not dry_run:
-            Team.objects.bulk_create([Team(name=n) for n in missing_teams])
-            existing_teams.update({t.name: t for t in Team.objects.filter(name__in=team_names)})
+        self.resolve_teams(r['team_name'] for r in rows)
 
         # Build lookup for players by (team_id, first_name, last_name)
-        # Query existing players matching any of the teams to reduce DB hits
-        team_ids = [existing_teams[n].id for n in existing_teams]
-        existing_players_qs = Player.objects.filter(team_id__in=team_ids)
-        existing_map = { (p.team_id, p.first_name.strip(), p.last_name.strip()): p for p in existing_players_qs }
+        # Only players sharing a team and last name with this batch can match
+        team_ids = {t.id for t in self.teams.values()}
+        last_names = {r['last_name'] for r in rows}
+        existing_map = {}
+        for names in batched(last_names, 500):
+            existing_players_qs = Player.objects.filter(team_id__in=team_ids, last_name__in=names)
+            existing_map.update({ (p.team_id, p.first_name.strip(), p.last_name.strip()): p for p in existing_players_qs })
 
         to_create = []
         to_update = []
-        attach_photos = []  # tuples of (player_instance, source_photo_path, photo_name)
+        photo_rows = []  # tuples of (player key, source_photo_path)
         created = updated = 0
 
         # Prepare model instances (not saved yet)
         for r in rows:
-            team = existing_teams.get(r['team_name'])
-            key = (team.id, r['first_name'], r['last_name'])
-            existing = existing_map.get(key)
+            team = self.teams.get(r['team_name'])
+            existing = existing_map.get((team.id, r['first_name'], r['last_name'])) if team else None
             if existing:
                 # detect whether any of the updatable fields changed
                 changed = False
@@ -147,11 +197,6 @@ class Command(BaseCommand):
                     changed = True
                 if changed:
                     to_update.append(existing)
-                # photo handling (attach if provided and not skipped)
-                if r['photo_raw'] and not skip_images:
-                    path = photo_file_for(r['photo_raw'], team_name=r['team_name'])
-                    if path:
-                        attach_photos.append((existing, path, os.path.basename(path)))
             else:
                 # build new instance
                 p = Player(
@@ -167,79 +212,193 @@ class Command(BaseCommand):
                     p.quote = r['quote']
                 to_create.append( (p, r) )  # keep row for photo later
 
+            # photo handling (attach if provided and not skipped)
+            if r['photo_raw'] and not skip_images:
+                path = self.locator.find(r['photo_raw'], team_name=r['team_name'])
+                if path:
+                    photo_rows.append(((team.id if team else None, r['first_name'], r['last_name']), path))
+
         if dry_run:
-            self.stdout.write(self.style.SUCCESS(f"Dry-run: {len(to_create)} to create, {len(to_update)} to update, {len(attach_photos)} photos to attach"))
-            return
+            return {'rows': row_count, 'created': len(to_create), 'updated': len(to_update), 'photos': len(photo_rows), 'unchanged': unchanged}
+
+        # Copy the photos before the transaction opens, so the database write
+        # lock isn't held while files are read and written
+        stored, ingester = self.store_photos({path for _, path in photo_rows})
 
         # Perform DB writes
         with transaction.atomic():
-            # bulk create new players in batches
-            if to_create:
-                if use_bulk:
-                    for i in range(0, len(to_create), batch_size):
-                        batch = [t[0] for t in to_create[i:i+batch_size]]
-                        Player.objects.bulk_create(batch, batch_size=batch_size)
-                    # need to refresh created instances to attach photos (query by recently created values)
-                    # simple approach: query by team and names in created list
-                    created_keys = [(p.team.id, p.first_name, p.last_name) for p,_ in to_create]
-                    qs = Player.objects.filter(
-                        Q()
+            if use_bulk:
+                # Upsert on the (team, first_name, last_name) constraint: one
+                # INSERT ... ON CONFLICT DO UPDATE per batch creates the new
+                # players, updates the changed ones and returns every pk
+                upserts = [p for p, _ in to_create] + [self.unsaved_copy(p) for p in to_update]
+                for i in range(0, len(upserts), batch_size):
+                    Player.objects.bulk_create(
+                        upserts[i:i+batch_size],
+                        update_conflicts=True,
+                        unique_fields=['team', 'first_name', 'last_name'],
+                        update_fields=UPSERT_FIELDS + ['updated_at'],
                     )
-                    # build Q to filter created players (construct ORs)
-                    q = Q(pk__in=[])
-                    created_lookup = []
-                    for team_id, fn, ln in created_keys:
-                        created_lookup.append(Q(team_id=team_id, first_name=fn, last_name=ln))
-                    if created_lookup:
-                        q = created_lookup.pop(0)
-                        for qq in created_lookup:
-                            q |= qq
-                        qs = Player.objects.filter(q)
-                    created_list = list(qs)
-                    existing_map.update({ (p.team_id, p.first_name, p.last_name): p for p in created_list })
-                    created = len(created_list)
-                else:
-                    # save individually so photos can be attached to instance immediately
-                    for p, r in to_create:
-                        p.save()
-                        created += 1
-                        if r['photo_raw'] and not skip_images:
-                            path = photo_file_for(r['photo_raw'], team_name=r['team_name'])
-                            if path:
-                                attach_photos.append((p, path, os.path.basename(path)))
-
-            # bulk update changed existing players (exclude photo/quote which we've already applied to model attributes)
-            if to_update and use_bulk:
-                # choose fields to update
-                fields = ['position', 'year', 'is_captain', 'shirt_number', 'quote']
-                for i in range(0, len(to_update), batch_size):
-                    Player.objects.bulk_update(to_update[i:i+batch_size], fields, batch_size=batch_size)
+                    search.index_queryset(Player.objects.filter(pk__in=[p.pk for p in upserts[i:i+batch_size]]))
+                existing_map.update({ (p.team_id, p.first_name, p.last_name): p for p in upserts })
+                created = len(to_create)
                 updated = len(to_update)
-            elif to_update:
+            else:
+                for p, r in to_create:
+                    p.save()
+                    created += 1
+                    existing_map[(p.team_id, p.first_name, p.last_name)] = p
                 for p in to_update:
                     p.save()
                     updated += 1
 
-            # attach photos (per-instance save required)
-            for inst, source_photo_path, photo_name in attach_photos:
+            # attach photos to new and existing players alike
+            attach_photos = [(existing_map[key], path) for key, path in photo_rows if key in existing_map]
+            failed = self.attach_photos(attach_photos, stored, ingester)
+
+            if self.options['incremental']:
+                self.record_manifest(rows, existing_map, failed)
+
+            # bulk_create/bulk_update bypass the model signals
+            invalidate_all()
+
+        return {'rows': row_count, 'created': created, 'updated': updated, 'photos': len(attach_photos), 'unchanged': unchanged}
+
+    def photo_path(self, r):
+        if not r['photo_raw'] or self.options['skip_images']:
+            return None
+        return self.locator.find(r['photo_raw'], team_name=r['team_name'])
+
+    def skip_unchanged(self, rows):
+        """Fingerprint ``rows`` and drop those whose fingerprint matches the
+        manifest from the last import of this sheet."""
+        recorded = {}
+        for names in batched({r['last_name'] for r in rows}, 500):
+            recorded.update({
+                (team, first, last): fingerprint
+                for team, first, last, fingerprint in ImportManifest.objects.filter(source=self.source, last_name__in=names)
+                .values_list('team_name', 'first_name', 'last_name', 'fingerprint')
+            })
+        changed = []
+        for r in rows:
+            r['fingerprint'] = row_fingerprint(r, self.photo_path(r), content_addressed=self.options['content_addressed'])
+            if recorded.get((r['team_name'], r['first_name'], r['last_name'])) != r['fingerprint']:
+                changed.append(r)
+        return changed
+
+    def record_manifest(self, rows, players, failed_photos):
+        """Remember the fingerprints of the rows just imported. Rows whose
+        photo couldn't be stored are left out so the next run retries them."""
+        entries = []
+        for r in rows:
+            player = players.get((self.teams[r['team_name']].id, r['first_name'], r['last_name']))
+            if player is None or self.photo_path(r) in failed_photos:
+                continue
+            entries.append(ImportManifest(source=self.source, team_name=r['team_name'], first_name=r['first_name'],
+                                          last_name=r['last_name'], player=player, fingerprint=r['fingerprint']))
+        ImportManifest.objects.bulk_create(
+            entries,
+            batch_size=self.options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['source', 'team_name', 'first_name', 'last_name'],
+            update_fields=['player', 'fingerprint', 'updated_at'],
+        )
+
+    def remove_missing(self):
+        """Forget manifest rows for players no longer in the sheet, deleting
+        the players too with --prune. Returns how many there were."""
+        missing = [
+            (pk, player_id)
+            for pk, player_id, *key in ImportManifest.objects.filter(source=self.source)
+            .values_list('pk', 'player_id', 'team_name', 'first_name', 'last_name').iterator()
+            if tuple(key) not in self.seen
+        ]
+        if self.options['dry_run'] or not missing:
+            return len(missing)
+        with transaction.atomic():
+            for batch in batched(missing, 500):
+                if self.options['prune']:
+                    # Cascades to the manifest rows
+                    Player.objects.filter(pk__in=[player_id for _, player_id in batch]).delete()
+                else:
+                    ImportManifest.objects.filter(pk__in=[pk for pk, _ in batch]).delete()
+        return len(missing)
+
+    @staticmethod
+    def unsaved_copy(player):
+        """A pk-less copy of an existing player for the upsert, carrying the
+        photo fields so the photo stage can tell whether they changed."""
+        copy = Player(team_id=player.team_id, first_name=player.first_name, last_name=player.last_name,
+                      photo=player.photo.name, photo_original_name=player.photo_original_name)
+        for field in UPSERT_FIELDS:
+            setattr(copy, field, getattr(player, field))
+        return copy
+
+    def store_photos(self, sources):
+        """Copy the photo files ``sources`` in on a thread pool.
+
+        Returns ``({path: (stored name, rewritten)}, ingester)``; the ingester
+        holds the hashes to record with content-addressed storage. Each
+        distinct source file is copied once even when several players share
+        it. Nothing is copied here with --defer-photos.
+        """
+        if self.options['defer_photos'] or not sources:
+            return {}, None
+
+        ingester = None
+        if self.options['content_addressed']:
+            # New content always gets a new name
+            ingester = PhotoIngester(sources)
+            store = lambda path: (ingester.ingest(path), False)
+        else:
+            upload_to = Player._meta.get_field('photo').upload_to
+            # Every source gets its own destination, so the copies can run in
+            # parallel without two writing the same file
+            store = lambda path: copy_photo(path, upload_to, self.locator.destination_name(path))
+
+        stored = {}
+        with ThreadPoolExecutor(max_workers=self.options['photo_workers']) as pool:
+            futures = {pool.submit(store, path): path for path in sources}
+            for future in as_completed(futures):
+                path = futures[future]
                 try:
-                    # Simply copy the file from source to the location Django expects
-                    # This avoids opening and re-saving the image, preserving original size/format
-                    destination_path = os.path.join(settings.MEDIA_ROOT, inst.photo.field.upload_to, photo_name)
-                    
-                    # Ensure the destination directory exists
-                    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
-                    
-                    # Copy the file
-                    shutil.copy2(source_photo_path, destination_path) # Use copy2 to preserve metadata if possible
-                    
-                    # Set the photo field on the instance to the new filename
-                    # Django will handle the path relative to MEDIA_ROOT internally
-                    inst.photo.name = os.path.relpath(destination_path, settings.MEDIA_ROOT).replace('\\', '/') # Ensure forward slashes for URLs
-                    inst.save(update_fields=['photo']) # Save only the photo field to update the database reference
-                    
+                    stored[path] = future.result()
                 except Exception as e:
-                    self.stdout.write(self.style.WARNING(f"Failed to attach photo for {inst.first_name} {inst.last_name} from {source_photo_path}: {e}"))
+                    self.stdout.write(self.style.WARNING(f"Failed to store photo {path}: {e}"))
+        return stored, ingester
+
+    def attach_photos(self, attach_photos, stored, ingester):
+        """Point the players at the photos ``store_photos`` copied in, with
+        one bulk_update. Returns the paths that couldn't be stored.
+
+        Players whose photo is already up to date are not written.
+        """
+        if self.options['defer_photos']:
+            # Committed together with the players; run_worker does the copying
+            enqueue_many('sports.importing.attach_player_photo',
+                         [(inst.pk, path, self.locator.destination_name(path)) for inst, path in attach_photos],
+                         content_addressed=self.options['content_addressed'])
+            return set()
 
-        self.stdout.write(self.style.SUCCESS(f"Import finished: {created} created, {updated} updated, {len(attach_photos)} photos attempted"))
-# ...existing code...
\ No newline at end of file
+        changed = []
+        now = timezone.now()
+        for inst, path in attach_photos:
+            if path not in stored:
+                continue
+            stored_name, rewritten = stored[path]
+            photo_name = os.path.basename(path)
+            if inst.photo.name == stored_name and inst.photo_original_name == photo_name and not rewritten:
+                continue  # unchanged since the last import
+            inst.photo.name = stored_name
+            inst.photo_original_name = photo_name
+            inst.renditions = {}
+            inst.updated_at = now
+            changed.append(inst)
+
+        Player.objects.bulk_update(changed, ['photo', 'photo_original_name', 'renditions', 'updated_at'], batch_size=self.options['batch_size'])
+        schedule_renditions_many(changed)
+        if ingester is not None:
+            ingester.save()
+            self.stdout.write(f"Content-addressed storage: {ingester.copied} new files stored")
+        return {path for _, path in attach_photos} - set(stored)
+# ...existing code...
@@ -0,0 +1,192 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from sports import standings
+from sports.cache import invalidate_all
+from sports.importing import batched, iter_rows, normalize_game_row
+from sports.models import Game, Opposition, Team
+
+# Fields an import may change on an existing game
+UPSERT_FIELDS = ['location', 'dcb_score', 'opp_score', 'is_finished']
+
+
+def choice_value(choices, raw):
+    """Accept either the stored code or the label of a choice, in any case:
+    'VB', 'vb' and 'Volleyball' all give 'VB'."""
+    wanted = raw.casefold()
+    for value, label in choices:
+        if wanted in (value.casefold(), label.casefold()):
+            return value
+    return None
+
+
+class Command(BaseCommand):
+    help = "Import a season's fixtures and results from a .xlsx, .csv or .jsonl file. Options: --file, --sheet, --batch-size, --dry-run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', '-f', default='games.xlsx', help='Columns: team, sport, level, opposition, date, time, location, dcb_score, opp_score, is_finished')
+        parser.add_argument('--sheet', '-s', default=0)
+        parser.add_argument('--batch-size', type=int, default=500, help='Games written per upsert')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and validate only; do not write to DB')
+
+    def handle(self, *args, **options):
+        filepath = options['file']
+        if not os.path.exists(filepath):
+            self.stdout.write(self.style.ERROR(f"File not found: {filepath}"))
+            return
+
+        try:
+            rows = self.read_rows(iter_rows(filepath, options['sheet']))
+        except (OSError, ValueError) as e:
+            self.stdout.write(self.style.ERROR(f"Failed to read {filepath}: {e}"))
+            return
+        if not rows:
+            self.stdout.write(self.style.WARNING("No valid rows to import"))
+            return
+
+        self.load_teams()
+        games = {}
+        for r in rows:
+            team = self.resolve_team(r)
+            if team is None:
+                continue
+            # The same fixture listed twice keeps its last row
+            games[(team.id, r['opposition'].casefold(), r['date'], r['time'])] = (team, r)
+
+        existing = self.existing_games(games)
+        rescheduled = self.rescheduled_games(games, existing)
+        updated = len(existing.keys() & games.keys()) + len(rescheduled)
+        created = len(games) - updated
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Dry-run: {created} games to create, {updated} to update"))
+            return
+
+        with transaction.atomic():
+            oppositions = self.resolve_oppositions({r['opposition'] for _, r in games.values()})
+            to_save = [
+                Game(
+                    dcb_team=team,
+                    opposition=oppositions[r['opposition'].casefold()],
+                    date=r['date'],
+                    time=r['time'],
+                    location=r['location'],
+                    dcb_score=r['dcb_score'],
+                    opp_score=r['opp_score'],
+                    is_finished=r['is_finished'],
+                )
+                for team, r in games.values()
+            ]
+            # Move rescheduled games to their new kick-off first, so the
+            # upsert below finds them
+            now = timezone.now()
+            Game.objects.bulk_update(
+                [Game(pk=pk, time=time, updated_at=now) for pk, time in rescheduled.items()],
+                ['time', 'updated_at'],
+                batch_size=options['batch_size'],
+            )
+            for batch in batched(to_save, options['batch_size']):
+                Game.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=['dcb_team', 'opposition', 'date', 'time'],
+                    update_fields=UPSERT_FIELDS + ['updated_at'],
+                )
+
+            # bulk_create bypasses the model signals
+            standings.rebuild({team.id for team, _ in games.values()})
+            invalidate_all()
+
+        self.stdout.write(self.style.SUCCESS(f"Import finished: {created} games created, {updated} updated"))
+
+    def read_rows(self, raw_rows):
+        rows = []
+        for idx, row in raw_rows:
+            r = normalize_game_row(row, idx)
+            if r is None:
+                self.stdout.write(self.style.WARNING(f"Row {idx}: needs a team, opposition and date; skipping"))
+                continue
+            rows.append(r)
+        return rows
+
+    def load_teams(self):
+        """Index every team by name. The table is small, so one query beats
+        a lookup per row."""
+        self.teams_by_name = {}
+        for team in Team.objects.all():
+            self.teams_by_name.setdefault(team.name.casefold(), []).append(team)
+
+    def resolve_team(self, r):
+        """Find the team for a row by name, narrowed by sport and level when
+        the row gives them. Warns and returns None when there is no single
+        match."""
+        candidates = self.teams_by_name.get(r['team_name'].casefold(), [])
+        if r['sport']:
+            sport = choice_value(Team.SPORT_CHOICES, r['sport'])
+            candidates = [t for t in candidates if t.sport == sport]
+        if r['level']:
+            level = choice_value(Team.LEVEL_CHOICES, r['level'])
+            candidates = [t for t in candidates if t.level == level]
+
+        if len(candidates) == 1:
+            return candidates[0]
+        if not candidates:
+            self.stdout.write(self.style.WARNING(f"Row {r['idx']}: no team {' '.join(filter(None, [r['team_name'], r['sport'], r['level']]))}; skipping"))
+        else:
+            self.stdout.write(self.style.WARNING(f"Row {r['idx']}: {len(candidates)} teams are called {r['team_name']}; add sport and level columns to tell them apart"))
+        return None
+
+    @staticmethod
+    def existing_games(games):
+        """{key: pk} of the games already stored for the teams and dates in
+        ``games``, in one query."""
+        if not games:
+            return {}
+        dates = [r['date'] for _, r in games.values()]
+        qs = Game.objects.filter(
+            dcb_team_id__in={team.id for team, _ in games.values()},
+            date__range=(min(dates), max(dates)),
+        ).values_list('dcb_team_id', 'opposition__name', 'date', 'time', 'pk')
+        return {(team_id, name.casefold(), date, time): pk for team_id, name, date, time, pk in qs}
+
+    @staticmethod
+    def rescheduled_games(games, existing):
+        """{pk: new time} for stored games whose kick-off has moved.
+
+        A game is taken to be rescheduled when, for its team, opposition and
+        day, the sheet has exactly one time that isn't stored and the
+        database exactly one time that isn't in the sheet. Anything less
+        clear-cut, like a second game that day, is imported as a new game.
+        """
+        def by_day(keys):
+            days = {}
+            for key in keys:
+                days.setdefault(key[:3], set()).add(key[3])
+            return days
+
+        stored_days = by_day(existing)
+        rescheduled = {}
+        for day, times in by_day(games).items():
+            stored = stored_days.get(day, set())
+            new, old = times - stored, stored - times
+            if len(new) == 1 and len(old) == 1:
+                rescheduled[existing[day + (old.pop(),)]] = new.pop()
+        return rescheduled
+
+    def resolve_oppositions(self, names):
+        """Return {casefolded name: Opposition} for ``names``, creating the
+        ones that don't exist yet."""
+        cache = {}
+        # Oldest row wins if an opposition was entered twice in the admin
+        for opposition in Opposition.objects.order_by('-pk'):
+            cache[opposition.name.casefold()] = opposition
+        missing = {}
+        for name in names:
+            if name.casefold() not in cache:
+                missing.setdefault(name.casefold(), Opposition(name=name))
+        if missing:
+            for opposition in Opposition.objects.bulk_create(missing.values()):
+                cache[opposition.name.casefold()] = opposition
+        return cache
@@ -1,105 +1,162 @@
-from openpyxl import load_workbook 
 import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from mysite.settings import BASE_DIR
-from sports.models import Team, Player 
+from django.db import transaction
+from django.utils import timezone
+from sports.models import Team, Player
+from sports import search
+from sports.cache import invalidate_all
+from sports.images import schedule_renditions_many
+from sports.importing import batched, iter_excel_rows
 
 class Command(BaseCommand):
-    help = 'Import players from excel file'
+    help = 'Import players from excel file. Photos are looked up in media/players/photos/<folder>/'
 
-    def handle(self, *args, **options):
-        folderName = str(input("Enter folder name: "))
+    def add_arguments(self, parser):
+        parser.add_argument('folder', help='Folder under media/players/photos/ holding this sheet\'s photos')
+        parser.add_argument('--file', '-f', default=os.path.join(settings.BASE_DIR, 'data.xlsx'))
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk query')
 
-        xlsx_file_path = os.path.join(settings.BASE_DIR, 'data.xlsx')
+    def handle(self, *args, **options):
+        folderName = options['folder']
+        xlsx_file_path = options['file']
+        batch_size = options['batch_size']
 
         if not os.path.exists(xlsx_file_path):
             self.stdout.write(self.style.ERROR('XLSX file not found at: {}'.format(xlsx_file_path)))
             return
 
-        workbook = load_workbook(xlsx_file_path)
-        worksheet = workbook.active  # Assumes data is on the first sheet
-
-        # Get headers from the first row
-        headers = [cell.value for cell in worksheet[1]]
-        self.stdout.write(self.style.SUCCESS(f'Headers found: {headers}'))
-
-        # Iterate through rows (starting from row 2 to skip header)
-        for row_num, row in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2):
-            # Create a dictionary mapping headers to row values
-            row_dict = {headers[i]: (row[i] if i < len(row) else None) for i in range(len(headers))}
-
-            # --- Process each row ---
-            team_name = row_dict.get('team')
-            first_name = row_dict.get('first_name') or ''
-            last_name = row_dict.get('last_name') or ''
-            position = row_dict.get('position') or ''
-            year_group_raw = row_dict.get('year_group')
-            photo_filename = row_dict.get('photo') or ''
-            is_captain_raw = row_dict.get('is_captain')
-            kit_number_raw = row_dict.get('kit_number')
-            quote = row_dict.get('Quote') or ''
-
-            year_group = ''
-            if year_group_raw is not None:
-                year_group = str(year_group_raw).strip()
-
-            # Validate required fields
-            if not team_name or not first_name or not last_name:
-                self.stdout.write(self.style.WARNING(f'Skipping row {row_num}: Missing required data (team, first_name, last_name). Values: {row_dict}'))
-                continue
-
-            # Get or create the Team
+        # Every photo in the folder, listed once rather than probed per row
+        photo_dir = os.path.join(settings.MEDIA_ROOT, 'players', 'photos', folderName)
+        try:
+            available_photos = {entry.name for entry in os.scandir(photo_dir) if entry.is_file()}
+        except OSError:
+            available_photos = set()
+
+        rows = []
+        for row_num, row_dict in iter_excel_rows(xlsx_file_path):
+            row_num += 1  # sheet row, counting the header
+            parsed = self.parse_row(row_num, row_dict)
+            if parsed is not None:
+                rows.append(parsed)
+
+        # Resolve every team in one query
+        teams = {t.name: t for t in Team.objects.filter(name__in={r['team_name'] for r in rows})}
+
+        created_count = existing_count = 0
+        with transaction.atomic():
+            for batch in batched(rows, batch_size):
+                created, existing = self.import_batch(batch, teams, folderName, available_photos, batch_size)
+                created_count += created
+                existing_count += existing
+
+            # bulk_create/bulk_update bypass the model signals
+            invalidate_all()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Player import from XLSX completed: {created_count} created, {existing_count} already existed.'))
+
+    def parse_row(self, row_num, row_dict):
+        # --- Process each row ---
+        team_name = row_dict.get('team')
+        first_name = row_dict.get('first_name') or ''
+        last_name = row_dict.get('last_name') or ''
+        position = row_dict.get('position') or ''
+        year_group_raw = row_dict.get('year_group')
+        photo_filename = row_dict.get('photo') or ''
+        is_captain_raw = row_dict.get('is_captain')
+        kit_number_raw = row_dict.get('kit_number')
+        quote = row_dict.get('Quote') or ''
+
+        year_group = ''
+        if year_group_raw is not None:
+            year_group = str(year_group_raw).strip()
+
+        # Validate required fields
+        if not team_name or not first_name or not last_name:
+            self.stdout.write(self.style.WARNING(f'Skipping row {row_num}: Missing required data (team, first_name, last_name). Values: {row_dict}'))
+            return None
+
+        # Parse boolean for captain
+        is_captain = False
+        if is_captain_raw is not None:
+            is_captain = str(is_captain_raw).strip().upper() in ['TRUE', '1', 'YES', 'Y']
+
+        # Parse kit number (shirt_number)
+        shirt_number = None
+        if kit_number_raw is not None:
             try:
-                team = Team.objects.get(name=team_name)
-            except Team.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f'Row {row_num}: Team "{team_name}" not found. Skipping player: {first_name} {last_name}'))
+                # Convert to int if it's a number-like value
+                shirt_number = int(kit_number_raw)
+            except (ValueError, TypeError):
+                self.stdout.write(self.style.WARNING(f'Row {row_num}: Invalid kit number for {first_name} {last_name}: {kit_number_raw}'))
+
+        return {
+            'row_num': row_num,
+            'team_name': team_name,
+            'first_name': str(first_name).strip(),
+            'last_name': str(last_name).strip(),
+            'position': str(position).strip(),
+            'year': year_group,
+            'is_captain': is_captain,
+            'shirt_number': shirt_number,
+            'quote': str(quote).strip(),
+            'photo': str(photo_filename).strip(),
+        }
+
+    def import_batch(self, rows, teams, folderName, available_photos, batch_size):
+        """Create the new players of one batch and attach photos, in a fixed
+        number of queries. Existing players keep their details, as with
+        get_or_create, and only have their photo updated."""
+        team_ids = {t.id for t in teams.values()}
+        existing = {
+            (p.team_id, p.first_name, p.last_name): p
+            for p in Player.objects.filter(team_id__in=team_ids, last_name__in={r['last_name'] for r in rows})
+        }
+
+        to_create = {}
+        to_update = []
+        existing_count = 0
+        for r in rows:
+            team = teams.get(r['team_name'])
+            if team is None:
+                self.stdout.write(self.style.WARNING(f'Row {r["row_num"]}: Team "{r["team_name"]}" not found. Skipping player: {r["first_name"]} {r["last_name"]}'))
                 continue
 
-            # Parse boolean for captain
-            is_captain = False
-            if is_captain_raw is not None:
-                is_captain = str(is_captain_raw).strip().upper() in ['TRUE', '1', 'YES', 'Y']
-
-            # Parse kit number (shirt_number)
-            shirt_number = None
-            if kit_number_raw is not None:
-                try:
-                    # Convert to int if it's a number-like value
-                    shirt_number = int(kit_number_raw)
-                except (ValueError, TypeError):
-                    self.stdout.write(self.style.WARNING(f'Row {row_num}: Invalid kit number for {first_name} {last_name}: {kit_number_raw}'))
-
-            # Create Player
-            player, created = Player.objects.get_or_create(
-                team=team,
-                first_name=first_name.strip(),
-                last_name=last_name.strip(),
-                defaults={
-                    'position': position.strip(),
-                    'year': year_group.strip(),  # Note: model field is 'year', but your sheet says 'year_group'
-                    'is_captain': is_captain,
-                    'shirt_number': shirt_number,
-                    'quote': quote.strip(),
-                }
-            )
-
-            # Handle photo
-            photo_filename = photo_filename.strip()
-            if photo_filename:
-                # Assuming photos are stored in 'media/players/photos/' or similar
-                photo_path = os.path.join(settings.MEDIA_ROOT, 'players', 'photos', folderName, photo_filename)
-                if os.path.exists(photo_path):
-                    # Set the photo field
-                    player.photo.name = f'players/photos/{folderName}/{photo_filename}'
-                    print(player.photo.name)
-                    player.save()
+            photo_name = ''
+            if r['photo']:
+                if r['photo'] in available_photos:
+                    photo_name = f'players/photos/{folderName}/{r["photo"]}'
                 else:
-                    self.stdout.write(self.style.WARNING(f'Row {row_num}: Photo not found: {photo_filename} for {player}'))
-
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Row {row_num}: Created player: {player}'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Row {row_num}: Player already exists: {player}'))
+                    self.stdout.write(self.style.WARNING(f'Row {r["row_num"]}: Photo not found: {r["photo"]} for {r["first_name"]} {r["last_name"]}'))
+
+            key = (team.id, r['first_name'], r['last_name'])
+            player = existing.get(key) or to_create.get(key)
+            if player is None:
+                to_create[key] = Player(
+                    team=team,
+                    first_name=r['first_name'],
+                    last_name=r['last_name'],
+                    position=r['position'],
+                    year=r['year'],
+                    is_captain=r['is_captain'],
+                    shirt_number=r['shirt_number'],
+                    quote=r['quote'],
+                    photo=photo_name,
+                )
+                self.stdout.write(self.style.SUCCESS(f'Row {r["row_num"]}: Created player: {r["first_name"]} {r["last_name"]}'))
+                continue
 
-        self.stdout.write(self.style.SUCCESS('✅ Player import from XLSX completed.'))
\ No newline at end of file
+            existing_count += 1
+            if photo_name and player.photo.name != photo_name:
+                player.photo.name = photo_name
+                player.renditions = {}
+                player.updated_at = timezone.now()
+                if player.pk:
+                    to_update.append(player)
+            self.stdout.write(self.style.WARNING(f'Row {r["row_num"]}: Player already exists: {player}'))
+
+        created = Player.objects.bulk_create(to_create.values(), batch_size=batch_size)
+        search.index(created)
+        Player.objects.bulk_update(to_update, ['photo', 'renditions', 'updated_at'], batch_size=batch_size)
+        schedule_renditions_many([p for p in created if p.photo] + to_update)
+        return len(created), existing_count
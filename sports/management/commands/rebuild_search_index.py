@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from sports import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of players, teams, coaches and legends"
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt with {count} documents"))
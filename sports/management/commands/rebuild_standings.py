@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from sports import standings
+from sports.cache import invalidate
+
+
+class Command(BaseCommand):
+    help = "Recompute team standings from finished games. Options: --team"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--team', type=int, action='append', dest='team_ids', help='Only rebuild this team id; may be repeated')
+
+    def handle(self, *args, **options):
+        count = standings.rebuild(options['team_ids'])
+        invalidate('standings')
+        self.stdout.write(self.style.SUCCESS(f"Standings rebuilt for {count} teams"))
@@ -0,0 +1,61 @@
+import os
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from sports import jobs
+
+
+class Command(BaseCommand):
+    help = "Run background jobs queued with sports.jobs.enqueue. Options: --concurrency, --visibility-timeout, --poll-interval, --burst"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', '-c', type=int, default=2, help='Number of worker threads in this process')
+        parser.add_argument('--visibility-timeout', type=int, default=jobs.VISIBILITY_TIMEOUT, help='Seconds before a running job is considered abandoned and retried')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty instead of waiting for more jobs')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        stop = threading.Event()
+        counts = {'done': 0, 'queued': 0, 'failed': 0}
+        lock = threading.Lock()
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+
+        def work(n):
+            worker_id = f'{prefix}:{n}'
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    try:
+                        job = jobs.claim(worker_id, options['visibility_timeout'])
+                    except OperationalError:
+                        # SQLite is busy with another writer; try again shortly
+                        job = None
+                    if job is None:
+                        if options['burst']:
+                            return
+                        stop.wait(options['poll_interval'])
+                        continue
+                    status = jobs.run(job)
+                    with lock:
+                        counts[status] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(n,), daemon=True) for n in range(concurrency)]
+        for t in threads:
+            t.start()
+        self.stdout.write(self.style.SUCCESS(f"Worker {prefix} started with {concurrency} threads"))
+        try:
+            while any(t.is_alive() for t in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the current jobs...")
+            stop.set()
+            for t in threads:
+                t.join()
+
+        self.stdout.write(self.style.SUCCESS(f"Worker finished: {counts['done']} done, {counts['queued']} retried, {counts['failed']} failed"))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0016_rename_image_coach_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['dcb_team', 'is_finished', 'date', 'time'], name='game_team_finished_date_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_players(apps, schema_editor):
+    # Merging would have to pick between photos, kit numbers and quotes
+    Player = apps.get_model('sports', 'Player')
+    duplicates = (Player.objects.values('team', 'first_name', 'last_name')
+                  .annotate(copies=Count('pk')).filter(copies__gt=1).order_by('team', 'last_name', 'first_name'))
+    if duplicates:
+        lines = [
+            f"  {d['first_name']} {d['last_name']} in team {d['team']}: "
+            + ', '.join(f'player {pk}' for pk in Player.objects.filter(
+                team=d['team'], first_name=d['first_name'], last_name=d['last_name'],
+            ).order_by('pk').values_list('pk', flat=True))
+            for d in duplicates
+        ]
+        raise RuntimeError(
+            'These players are entered more than once in the same team. Delete '
+            'or rename the extra copies in the admin, then run migrate again:\n' + '\n'.join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0020_photo_source'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_players, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='player',
+            constraint=models.UniqueConstraint(fields=('team', 'first_name', 'last_name'), name='unique_player_per_team'),
+        ),
+    ]
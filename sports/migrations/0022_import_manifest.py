@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0021_unique_player_per_team'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Sheet the row came from', max_length=255)),
+                ('team_name', models.CharField(max_length=100)),
+                ('first_name', models.CharField(max_length=50)),
+                ('last_name', models.CharField(max_length=50)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_manifests', to='sports.player')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'team_name', 'first_name', 'last_name'), name='unique_manifest_row')],
+            },
+        ),
+    ]
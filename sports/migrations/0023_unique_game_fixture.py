@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:41
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_fixtures(apps, schema_editor):
+    # Refuse to guess which copy of a game holds the right score
+    Game = apps.get_model('sports', 'Game')
+    duplicates = (Game.objects.values('dcb_team', 'opposition', 'date', 'time')
+                  .annotate(copies=Count('pk')).filter(copies__gt=1).order_by('date', 'time'))
+    if duplicates:
+        lines = [
+            f"  team {d['dcb_team']} vs opposition {d['opposition']} on {d['date']} at {d['time']}: "
+            + ', '.join(f'game {pk}' for pk in Game.objects.filter(
+                dcb_team=d['dcb_team'], opposition=d['opposition'], date=d['date'], time=d['time'],
+            ).order_by('pk').values_list('pk', flat=True))
+            for d in duplicates
+        ]
+        raise RuntimeError(
+            'These games are entered more than once. Delete or reschedule the '
+            'extra copies in the admin, then run migrate again:\n' + '\n'.join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0022_import_manifest'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_fixtures, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='game',
+            constraint=models.UniqueConstraint(fields=('dcb_team', 'opposition', 'date', 'time'), name='unique_game_fixture'),
+        ),
+    ]
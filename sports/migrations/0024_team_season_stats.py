@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0023_unique_game_fixture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamSeasonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sport', models.CharField(choices=[('VB', 'Volleyball'), ('FB', 'Football'), ('BB', 'Basketball'), ('TE', 'Tennis'), ('BD', 'Badminton'), ('TR', 'Track & Field'), ('SW', 'Swimming')], max_length=5)),
+                ('season', models.CharField(choices=[('1', 'Season 1'), ('2', 'Season 2'), ('3', 'Season 3'), ('4', 'Season 4')], max_length=10)),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('played', models.IntegerField(default=0)),
+                ('won', models.IntegerField(default=0)),
+                ('drawn', models.IntegerField(default=0)),
+                ('lost', models.IntegerField(default=0)),
+                ('points_for', models.IntegerField(default=0)),
+                ('points_against', models.IntegerField(default=0)),
+                ('streak', models.IntegerField(default=0, help_text='Consecutive wins (positive) or losses (negative); 0 after a draw')),
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='season_stats', to='sports.team')),
+            ],
+            options={
+                'ordering': ['-won', '-drawn', 'lost'],
+                'indexes': [models.Index(fields=['sport', 'year', 'season'], name='stats_sport_year_season_idx')],
+            },
+        ),
+    ]
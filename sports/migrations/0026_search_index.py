@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0025_updated_at'),
+    ]
+
+    # FTS5 full-text index maintained by sports.search; fill it for existing
+    # rows with ``manage.py rebuild_search_index``
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE VIRTUAL TABLE sports_search USING fts5(
+                    url UNINDEXED,
+                    detail UNINDEXED,
+                    title,
+                    body,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """,
+            reverse_sql='DROP TABLE sports_search',
+        ),
+    ]
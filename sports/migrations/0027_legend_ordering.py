@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sports', '0026_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='legend',
+            options={'ordering': ['name', 'pk']},
+        ),
+        migrations.AddIndex(
+            model_name='legend',
+            index=models.Index(fields=['name', 'id'], name='legend_name_idx'),
+        ),
+    ]
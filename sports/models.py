@@ -1,10 +1,9 @@
 from django.db import models
-import random
-from PIL import Image
 from django.conf import settings
+from .images import ImageRenditions
 # Create your models here.
 
-class Team(models.Model):
+class Team(ImageRenditions):
     SPORT_CHOICES = [
         ('VB', 'Volleyball'),
         ('FB', 'Football'),
@@ -40,17 +39,40 @@ class Team(models.Model):
     description = models.TextField(blank=True, help_text="Brief team description or motto")
     photo = models.ImageField(upload_to='teams/photos/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     honors = models.CharField(max_length=100, help_text="Honors")
     instagram = models.URLField(blank=True, null=True)
     
+    # The accessors below are called several times per render by the
+    # templates, so each result is memoized on the instance. When the
+    # relation has been prefetched (see sports.loaders) they are answered
+    # from the prefetch cache without touching the database.
+    def _is_prefetched(self, relation):
+        return relation in getattr(self, '_prefetched_objects_cache', {})
+
     def get_captain(self):
-        return self.players.filter(is_captain=True).first()
+        if '_captain' not in self.__dict__:
+            if self._is_prefetched('players'):
+                self._captain = next((p for p in self.players.all() if p.is_captain), None)
+            else:
+                self._captain = self.players.filter(is_captain=True).first()
+        return self._captain
     
     def get_coach(self):
-        return self.coaches.filter(is_student_coach=False)
+        if '_head_coaches' not in self.__dict__:
+            if self._is_prefetched('coaches'):
+                self._head_coaches = [c for c in self.coaches.all() if not c.is_student_coach]
+            else:
+                self._head_coaches = list(self.coaches.filter(is_student_coach=False))
+        return self._head_coaches
     
     def get_student_coach(self):
-         return self.coaches.filter(is_student_coach=True)
+        if '_student_coaches' not in self.__dict__:
+            if self._is_prefetched('coaches'):
+                self._student_coaches = [c for c in self.coaches.all() if c.is_student_coach]
+            else:
+                self._student_coaches = list(self.coaches.filter(is_student_coach=True))
+        return self._student_coaches
 
     class Meta:
         ordering = ['sport', 'level', 'name']
@@ -58,25 +80,15 @@ class Team(models.Model):
 
     def __str__(self):
         return f"{self.get_level_display()} {self.get_sport_display()}"
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.photo:
-            img = Image.open(self.photo.path)
 
-            if img.height > 1920 or img.width > 1080:
-                output_size = (1920, 1080)
-                img.thumbnail(output_size) # Maintain aspect ratio
-                img.save(self.photo.path)
 
-
-class Coach(models.Model):
+class Coach(ImageRenditions):
     is_student_coach = models.BooleanField(default=False)
     name = models.CharField(max_length=300)
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="coaches")
     photo = models.ImageField(upload_to='legends/', blank=True, null=True)
     year = models.CharField(max_length=10, blank=True, help_text="e.g., 9th, 10th, 11th, 12th")
+    updated_at = models.DateTimeField(auto_now=True)
 
     DEFAULT_PICS = [
         'amongus/Orange.png',
@@ -93,29 +105,21 @@ class Coach(models.Model):
         if self.photo:
             return self.photo.url
         else:
-            return settings.MEDIA_URL + random.choice(self.DEFAULT_PICS)
-        
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.photo:
-            img = Image.open(self.photo.path)
-
-            if img.height > 150 or img.width > 350:
-                output_size = (500, 500)
-                img.thumbnail(output_size) # Maintain aspect ratio
-                img.save(self.photo.path)
+            # Picked by pk so the same page always renders the same bytes
+            return settings.MEDIA_URL + self.DEFAULT_PICS[(self.pk or 0) % len(self.DEFAULT_PICS)]
 
 
-class Player(models.Model):
+class Player(ImageRenditions):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='players')
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     position = models.CharField(max_length=50, blank=True)
     year = models.CharField(max_length=10, blank=True, help_text="e.g., 9th, 10th, 11th, 12th")
     photo = models.ImageField(upload_to='players/photos/', blank=True, null=True, default='')
+    photo_original_name = models.CharField(max_length=255, blank=True, help_text="Filename the photo was imported from")
     is_captain = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     shirt_number = models.IntegerField(blank=True, null=True)
     quote = models.CharField(max_length=500, blank=True, null=True)
     
@@ -129,6 +133,10 @@ class Player(models.Model):
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        constraints = [
+            # The natural key imports match on; lets import_excel --bulk upsert
+            models.UniqueConstraint(fields=['team', 'first_name', 'last_name'], name='unique_player_per_team'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -137,23 +145,14 @@ class Player(models.Model):
         if self.photo:
             return self.photo.url
         else:
-            return settings.MEDIA_URL + random.choice(self.DEFAULT_PICS)
-        
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.photo:
-            img = Image.open(self.photo.path)
-
-            if img.height > 150 or img.width > 350:
-                output_size = (500, 500)
-                img.thumbnail(output_size) # Maintain aspect ratio
-                img.save(self.photo.path)
+            # Picked by pk so the same page always renders the same bytes
+            return settings.MEDIA_URL + self.DEFAULT_PICS[(self.pk or 0) % len(self.DEFAULT_PICS)]
     
 
 class Opposition(models.Model):
     name = models.CharField(max_length=50)
     opp_logo = models.ImageField(upload_to='teams/opposition/photos/', blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name}"
@@ -168,6 +167,17 @@ class Game(models.Model):
     time = models.TimeField()  # This is what you want for manual time
     location = models.CharField(max_length=200)
     is_finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # The natural key import_games upserts on
+            models.UniqueConstraint(fields=['dcb_team', 'opposition', 'date', 'time'], name='unique_game_fixture'),
+        ]
+        indexes = [
+            # Serves the per-team results/upcomings keyset pagination
+            models.Index(fields=['dcb_team', 'is_finished', 'date', 'time'], name='game_team_finished_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.dcb_team} vs {self.opposition} - {self.date} {self.time}"
@@ -178,26 +188,51 @@ class Game(models.Model):
         return datetime.combine(self.date, self.time)
 
 
-class Event(models.Model):
+class TeamSeasonStats(models.Model):
+    """A team's record from its finished games, kept current by
+    ``sports.standings`` as games change.
+
+    Sport, season and year are copied from the team so a standings page is
+    one indexed read.
+    """
+    team = models.OneToOneField(Team, on_delete=models.CASCADE, related_name='season_stats')
+    sport = models.CharField(max_length=5, choices=Team.SPORT_CHOICES)
+    season = models.CharField(max_length=10, choices=Team.SEASON_CHOICES)
+    year = models.IntegerField(blank=True, null=True)
+    played = models.IntegerField(default=0)
+    won = models.IntegerField(default=0)
+    drawn = models.IntegerField(default=0)
+    lost = models.IntegerField(default=0)
+    points_for = models.IntegerField(default=0)
+    points_against = models.IntegerField(default=0)
+    streak = models.IntegerField(default=0, help_text="Consecutive wins (positive) or losses (negative); 0 after a draw")
+
+    class Meta:
+        ordering = ['-won', '-drawn', 'lost']
+        indexes = [
+            models.Index(fields=['sport', 'year', 'season'], name='stats_sport_year_season_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.team}: {self.won}-{self.drawn}-{self.lost}"
+
+    @property
+    def points_difference(self):
+        return self.points_for - self.points_against
+
+
+class Event(ImageRenditions):
+    rendition_field = 'image'
+
     event_name = models.CharField(max_length=50)
     date = models.DateField()
     time = models.TimeField()
     location = models.CharField(max_length=200)
     image = models.ImageField(upload_to='events/')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.event_name
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        if self.photo:
-            img = Image.open(self.photo.path)
-
-            if img.height > 1920 or img.width > 1080:
-                output_size = (1920, 1080)
-                img.thumbnail(output_size) # Maintain aspect ratio
-                img.save(self.photo.path)
 
 
 class Legend(models.Model):
@@ -205,6 +240,7 @@ class Legend(models.Model):
     teams = models.CharField(max_length=200)
     image = models.ImageField(upload_to='legends/', blank=True, null=True)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     DEFAULT_PICS = [
         'amongus/Orange.png',
@@ -213,6 +249,13 @@ class Legend(models.Model):
         'amongus/Red.png',
         'amongus/Purple.png',
     ]
+
+    class Meta:
+        ordering = ['name', 'pk']
+        indexes = [
+            # Serves the legends keyset pagination
+            models.Index(fields=['name', 'id'], name='legend_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -221,5 +264,80 @@ class Legend(models.Model):
         if self.image:
             return self.image.url
         else:
-            return settings.MEDIA_URL + random.choice(self.DEFAULT_PICS)
-        
\ No newline at end of file
+            # Picked by pk so the same page always renders the same bytes
+            return settings.MEDIA_URL + self.DEFAULT_PICS[(self.pk or 0) % len(self.DEFAULT_PICS)]
+        
+
+class PhotoSource(models.Model):
+    """Where an imported photo came from and where it is stored.
+
+    Lets imports recognise an unchanged source file from its size and
+    mtime alone instead of re-reading and re-hashing it.
+    """
+    path = models.CharField(max_length=500, unique=True)
+    size = models.BigIntegerField()
+    mtime_ns = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    stored_name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.path
+
+
+class ImportManifest(models.Model):
+    """The fingerprint of the sheet row a player was last imported from.
+
+    ``import_excel --incremental`` skips rows whose fingerprint hasn't
+    changed and reports players whose rows have disappeared from the sheet.
+    """
+    source = models.CharField(max_length=255, help_text="Sheet the row came from")
+    team_name = models.CharField(max_length=100)
+    first_name = models.CharField(max_length=50)
+    last_name = models.CharField(max_length=50)
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='import_manifests')
+    fingerprint = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'team_name', 'first_name', 'last_name'], name='unique_manifest_row'),
+        ]
+
+    def __str__(self):
+        return f"{self.source}: {self.first_name} {self.last_name} ({self.team_name})"
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_worker``.
+
+    Use ``sports.jobs.enqueue`` rather than creating rows directly.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200, help_text="Dotted path of the function to call")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(help_text="Not picked up before this time")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True, help_text="Running jobs whose lock expires are picked up again")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_at', 'pk']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.get_status_display()})"
@@ -0,0 +1,125 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 4
+MAX_PAGE_SIZE = 20
+
+# Newest first; pk breaks ties between games sharing a kick-off.
+GAME_ORDERING = ('-date', '-time', '-pk')
+# Alphabetical; pk breaks ties between legends sharing a name.
+LEGEND_ORDERING = ('name', 'pk')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size(request, default=None, cap=None):
+    """Page size from ``?size=``, falling back to ``default`` and clamped to
+    ``cap``; both default to the configured game page sizes."""
+    if default is None:
+        default = getattr(settings, 'SPORTS_GAMES_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    if cap is None:
+        cap = getattr(settings, 'SPORTS_GAMES_PAGE_SIZE_MAX', MAX_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, cap))
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def game_cursor(game):
+    """Opaque cursor pointing just past ``game`` in ``GAME_ORDERING``."""
+    return encode_cursor([game.date.isoformat(), game.time.isoformat(), game.pk])
+
+
+def games_after(queryset, cursor):
+    """Restrict ``queryset`` to the games that sort after ``cursor``.
+
+    This is a keyset seek on ``(date, time, pk)`` so it is served by the
+    ``(dcb_team, is_finished, date, time)`` index however deep the cursor is.
+    """
+    queryset = queryset.order_by(*GAME_ORDERING)
+    if not cursor:
+        return queryset
+    try:
+        date, time, pk = decode_cursor(cursor)
+        date = datetime.date.fromisoformat(date)
+        time = datetime.time.fromisoformat(time)
+        pk = int(pk)
+    except (InvalidCursor, TypeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+    return queryset.filter(
+        Q(date__lt=date)
+        | Q(date=date, time__lt=time)
+        | Q(date=date, time=time, pk__lt=pk)
+    )
+
+
+def paginate_games(queryset, cursor, size):
+    """Return ``(games, next_cursor)``; ``next_cursor`` is ``None`` on the
+    last page."""
+    games = list(games_after(queryset, cursor)[:size + 1])
+    if len(games) > size:
+        games = games[:size]
+        return games, game_cursor(games[-1])
+    return games, None
+
+
+def legend_cursor(legend):
+    """Opaque cursor pointing at ``legend`` in ``LEGEND_ORDERING``."""
+    return encode_cursor([legend.name, legend.pk])
+
+
+def decode_legend_cursor(cursor):
+    try:
+        name, pk = decode_cursor(cursor)
+        if not isinstance(name, str):
+            raise TypeError(name)
+        return name, int(pk)
+    except (InvalidCursor, TypeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def paginate_legends(queryset, size, after=None, before=None):
+    """Return ``(legends, previous_cursor, next_cursor)`` for the page just
+    after the ``after`` cursor or just before the ``before`` one (the first
+    page with neither). A cursor is ``None`` when there is nothing further
+    that way.
+
+    Both directions are keyset seeks on ``(name, pk)``, served by
+    ``legend_name_idx``, so a deep page costs the same as the first.
+    """
+    if before:
+        name, pk = decode_legend_cursor(before)
+        rows = list(queryset.filter(Q(name__lt=name) | Q(name=name, pk__lt=pk)).order_by('-name', '-pk')[:size + 1])
+        legends = rows[:size][::-1]
+        previous = legend_cursor(legends[0]) if len(rows) > size else None
+        return legends, previous, legend_cursor(legends[-1]) if legends else None
+
+    queryset = queryset.order_by(*LEGEND_ORDERING)
+    if after:
+        name, pk = decode_legend_cursor(after)
+        queryset = queryset.filter(Q(name__gt=name) | Q(name=name, pk__gt=pk))
+    rows = list(queryset[:size + 1])
+    legends = rows[:size]
+    previous = legend_cursor(legends[0]) if after and legends else None
+    return legends, previous, legend_cursor(legends[-1]) if len(rows) > size else None
@@ -0,0 +1,37 @@
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django_ratelimit import ALL
+from django_ratelimit.core import is_ratelimited
+from django_ratelimit.decorators import ratelimit as sync_ratelimit
+from django_ratelimit.exceptions import Ratelimited
+
+
+def ratelimit(group=None, key=None, rate=None, method=ALL, block=True):
+    """``django_ratelimit``'s decorator, extended to async views.
+
+    Its own wrapper is synchronous, which would make Django run an async
+    view in a thread and get back an unawaited coroutine. For coroutine
+    functions the check (a cache round trip) runs through ``sync_to_async``
+    and the view is awaited.
+    """
+    def decorator(fn):
+        if not iscoroutinefunction(fn):
+            return sync_ratelimit(group=group, key=key, rate=rate, method=method, block=block)(fn)
+
+        @wraps(fn)
+        async def wrapped(request, *args, **kwargs):
+            old_limited = getattr(request, 'limited', False)
+            ratelimited = await sync_to_async(is_ratelimited)(
+                request=request, group=group, fn=fn, key=key, rate=rate, method=method, increment=True,
+            )
+            request.limited = ratelimited or old_limited
+            if ratelimited and block:
+                cls = getattr(settings, 'RATELIMIT_EXCEPTION_CLASS', Ratelimited)
+                raise (import_string(cls) if isinstance(cls, str) else cls)()
+            return await fn(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,129 @@
+import re
+
+from django.db import connection, transaction
+from django.urls import reverse
+
+from .models import Coach, Legend, Player, Team
+
+
+# Full-text search over players, teams, coaches and legends, backed by the
+# FTS5 table ``sports_search`` (migration 0026). The model signals keep it in
+# step; rebuild() refills it after bulk writes that bypass them.
+#
+# A document's rowid encodes its model and pk (pk * len(KINDS) + kind), so
+# replacing or removing one is a rowid lookup rather than a scan, and a
+# search needs no join to say what each hit is.
+
+TABLE = 'sports_search'
+KINDS = ['player', 'team', 'coach', 'legend']
+MODELS = {Player: 'player', Team: 'team', Coach: 'coach', Legend: 'legend'}
+
+SEARCH_RESULTS = 10
+SEARCH_RESULTS_MAX = 50
+# Titles (names) count for more than descriptions and quotes; the
+# unindexed url and detail columns get no weight
+RANK = f'bm25({TABLE}, 0, 0, 10.0, 1.0)'
+BATCH_SIZE = 500
+
+
+def rowid(kind, pk):
+    return pk * len(KINDS) + KINDS.index(kind)
+
+
+def document(instance):
+    """``(rowid, url, detail, title, body)`` for a Player, Team, Coach or
+    Legend. Players and coaches read ``team``, so select it with them."""
+    kind = MODELS[type(instance)]
+    if kind == 'player':
+        team = instance.team
+        url = reverse('player', args=[team.name, instance.pk])
+        detail, title = str(team), str(instance)
+        body = ' '.join(filter(None, [instance.position, instance.quote]))
+    elif kind == 'team':
+        url = reverse('team', args=[instance.name])
+        detail, title = str(instance), instance.name
+        body = ' '.join(filter(None, [str(instance), instance.description, instance.honors]))
+    elif kind == 'coach':
+        team = instance.team
+        url = reverse('team', args=[team.name])
+        detail, title = str(team), instance.name
+        body = ' '.join([str(team), 'student coach' if instance.is_student_coach else 'coach'])
+    else:
+        url = reverse('legends')
+        detail, title = instance.teams, instance.name
+        body = ' '.join(filter(None, [instance.teams, instance.description]))
+    return rowid(kind, instance.pk), url, detail, title, body
+
+
+def index(instances):
+    """Add or replace the documents of ``instances``."""
+    documents = [document(instance) for instance in instances]
+    if not documents:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(doc[0],) for doc in documents])
+        cursor.executemany(f'INSERT INTO {TABLE} (rowid, url, detail, title, body) VALUES (%s, %s, %s, %s, %s)', documents)
+
+
+def index_queryset(queryset):
+    """Index every object of ``queryset`` in batches and return how many
+    there were."""
+    if queryset.model in (Player, Coach):
+        queryset = queryset.select_related('team')
+    batch, count = [], 0
+    for instance in queryset.iterator(chunk_size=BATCH_SIZE):
+        batch.append(instance)
+        count += 1
+        if len(batch) == BATCH_SIZE:
+            index(batch)
+            batch = []
+    index(batch)
+    return count
+
+
+def remove(instance):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid(MODELS[type(instance)], instance.pk)])
+
+
+def rebuild():
+    """Re-index everything from scratch and return the document count."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        count = sum(index_queryset(model.objects.all()) for model in MODELS)
+        with connection.cursor() as cursor:
+            # Merge the segments written above into one b-tree
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return count
+
+
+def match_expression(text):
+    """An FTS5 query matching every word of ``text`` as a prefix, or '' if
+    there are none. Words are quoted so FTS5 syntax in the input is inert."""
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(text, limit=SEARCH_RESULTS):
+    """The best ``limit`` matches for ``text``, best first, each a dict
+    with ``kind``, ``id``, ``title``, ``detail`` and ``url``."""
+    expression = match_expression(text)
+    if not expression:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, url, detail, title FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY {RANK} LIMIT %s',
+            [expression, limit],
+        )
+        rows = cursor.fetchall()
+    return [
+        {
+            'kind': KINDS[rid % len(KINDS)],
+            'id': rid // len(KINDS),
+            'title': title,
+            'detail': detail,
+            'url': url,
+        }
+        for rid, url, detail, title in rows
+    ]
@@ -0,0 +1,193 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import storages
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+
+# A hashed name never changes content, so browsers may keep it for a year
+# without asking again. Plain names must be revalidated.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+# Single byte ranges only; anything else is answered with the whole file,
+# which RFC 9110 allows
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+# Precompressed variants written by CompressedManifestStaticFilesStorage,
+# best first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def accepted_encodings(request):
+    """Content codings named in Accept-Encoding, minus any refused with
+    ``q=0``."""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '').lower()
+        if params.startswith('q=') and not params[2:].strip('0.'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def hashed_names():
+    """The hashed names in the static files manifest, as a set built once
+    per loaded manifest rather than on every request."""
+    files = getattr(staticfiles_storage, 'hashed_files', {})
+    cached = getattr(staticfiles_storage, '_sports_hashed_names', None)
+    if cached is None or cached[0] is not files:
+        cached = staticfiles_storage._sports_hashed_names = (files, frozenset(files.values()))
+    return cached[1]
+
+
+@require_safe
+def static_asset(request, path):
+    """Serve a collected static file, preferring a precompressed variant
+    the client accepts."""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    hashed = path in hashed_names()
+    stat = os.stat(full_path)
+    if hashed and ('If-None-Match' in request.headers or 'If-Modified-Since' in request.headers):
+        # Whatever copy the client has is current
+        return HttpResponseNotModified()
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    serve_path, encoding = full_path, None
+    accepted = accepted_encodings(request)
+    for coding, ext in ENCODINGS:
+        if coding in accepted and os.path.isfile(full_path + ext):
+            serve_path, encoding = full_path + ext, coding
+            break
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    response = FileResponse(open(serve_path, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    response.headers['Cache-Control'] = IMMUTABLE if hashed else REVALIDATE
+    return response
+
+
+def byte_range(header, size):
+    """The inclusive ``(start, end)`` asked for by a ``Range`` header, or
+    None to send the whole file. Raises ValueError when the range lies
+    entirely past the end of the file, which every range does for an empty
+    one."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-500 is the last 500 bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError('empty suffix range')
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if start >= size:
+        raise ValueError('range starts past the end')
+    if last and int(last) < start:
+        return None
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(f, start, length):
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def media_cache_control(path):
+    # Content-addressed names (see ContentAddressedStorage) never change
+    # content; uploads and renditions can be replaced under the same name
+    if path.startswith(storages['content_addressed'].prefix + '/'):
+        return IMMUTABLE
+    return f"public, max-age={getattr(settings, 'SPORTS_MEDIA_MAX_AGE', 60 * 60 * 24 * 7)}"
+
+
+@require_safe
+def media_file(request, path):
+    """Serve an uploaded file from MEDIA_ROOT.
+
+    With ``SPORTS_MEDIA_OFFLOAD`` set the view only checks the path and
+    validators, then hands the transfer to the web server through
+    ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache, lighttpd), so no
+    worker is held while the bytes go out. Otherwise the file is streamed
+    here, honouring single byte ranges.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    last_modified = http_date(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is not None:
+        response.headers['Cache-Control'] = media_cache_control(path)
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    offload = getattr(settings, 'SPORTS_MEDIA_OFFLOAD', None)
+    if offload == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Accel-Redirect'] = quote(settings.SPORTS_MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + path)
+    elif offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Sendfile'] = full_path
+    else:
+        # A stale If-Range means the client's partial copy is out of date,
+        # so it gets the whole file
+        if_range = request.headers.get('If-Range')
+        try:
+            requested = None if if_range not in (None, etag, last_modified) else byte_range(request.headers.get('Range'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if requested is None:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        else:
+            start, end = requested
+            response = StreamingHttpResponse(
+                read_range(open(full_path, 'rb'), start, end - start + 1),
+                status=206, content_type=content_type,
+            )
+            response.headers['Content-Length'] = str(end - start + 1)
+            response.headers['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response.headers['Accept-Ranges'] = 'bytes'
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = last_modified
+    response.headers['Cache-Control'] = media_cache_control(path)
+    return response
@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import search, standings
+from .cache import invalidate
+from .models import Team, Player, Coach, Game, Opposition, Event, Legend, TeamSeasonStats
+
+
+# Which cached pages each model shows up on; see sports.cache for the tags.
+
+def team_tag(team_getter):
+    try:
+        return f'team:{team_getter().name}'
+    except Team.DoesNotExist:
+        # Deleted along with its team; the team's own signal covers it
+        return 'rosters'
+
+
+def previous_team_tags(old_team_id, team_id):
+    """The tag of the team a saved object moved away from, if it moved;
+    that roster lists it until it is re-rendered."""
+    if old_team_id is None or old_team_id == team_id:
+        return []
+    name = Team.objects.filter(pk=old_team_id).values_list('name', flat=True).first()
+    return [f'team:{name}'] if name is not None else []
+
+
+@receiver([post_save, post_delete], sender=Game)
+def game_changed(sender, instance, **kwargs):
+    before = getattr(instance, '_standings_before', None)
+    moved = previous_team_tags(before and before[0], instance.dcb_team_id)
+    invalidate('index', 'standings', team_tag(lambda: instance.dcb_team), *moved)
+
+
+@receiver([post_save, post_delete], sender=Opposition)
+def opposition_changed(sender, instance, **kwargs):
+    invalidate('index', 'rosters')
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, **kwargs):
+    invalidate('index')
+
+
+@receiver([post_save, post_delete], sender=Team)
+def team_changed(sender, instance, **kwargs):
+    # Team names appear on every game card and a rename moves the roster URL
+    invalidate('index', 'teams', 'rosters', 'standings')
+
+
+@receiver([post_save, post_delete], sender=Legend)
+def legend_changed(sender, instance, **kwargs):
+    invalidate('legends')
+
+
+@receiver(pre_save, sender=Player)
+@receiver(pre_save, sender=Coach)
+def member_stash_team(sender, instance, raw=False, **kwargs):
+    old_team_id = None
+    if instance.pk and not raw:
+        old_team_id = sender.objects.filter(pk=instance.pk).values_list('team_id', flat=True).first()
+    instance._team_before = old_team_id
+
+
+@receiver([post_save, post_delete], sender=Player)
+@receiver([post_save, post_delete], sender=Coach)
+def member_changed(sender, instance, **kwargs):
+    moved = previous_team_tags(getattr(instance, '_team_before', None), instance.team_id)
+    invalidate('teams', team_tag(lambda: instance.team), *moved)
+
+
+# Standings
+
+@receiver(pre_save, sender=Game)
+def game_stash_state(sender, instance, raw=False, **kwargs):
+    before = None
+    if instance.pk and not raw:
+        before = Game.objects.filter(pk=instance.pk).values_list('dcb_team_id', 'is_finished', 'dcb_score', 'opp_score').first()
+    instance._standings_before = before
+
+
+@receiver(post_save, sender=Game)
+def game_saved_standings(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    standings.record_change(getattr(instance, '_standings_before', None), standings.game_state(instance))
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted_standings(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Team) or getattr(origin, 'model', None) is Team:
+        # The team's stats are being deleted with it
+        return
+    # Never creates a stats row: one created mid-delete would escape the
+    # cascade that is removing the team
+    standings.record_change(standings.game_state(instance), None, create_missing=False)
+
+
+@receiver(post_save, sender=Team)
+def team_saved_standings(sender, instance, raw=False, **kwargs):
+    TeamSeasonStats.objects.filter(team=instance).update(sport=instance.sport, season=instance.season, year=instance.year)
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_save, sender=Coach)
+@receiver(post_save, sender=Legend)
+def search_document_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index([instance])
+
+
+@receiver(post_save, sender=Team)
+def search_team_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index([instance])
+    # Their documents show the team's name and link to its roster
+    search.index_queryset(instance.players.all())
+    search.index_queryset(instance.coaches.all())
+
+
+@receiver(post_delete, sender=Player)
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=Coach)
+@receiver(post_delete, sender=Legend)
+def search_document_deleted(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SPORTS_SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,146 @@
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Game, Team, TeamSeasonStats
+from .pagination import GAME_ORDERING
+
+
+# Keeps TeamSeasonStats in step with Game. Saving or deleting one game
+# adjusts the counters of the teams involved with F() updates instead of
+# re-aggregating their games; rebuild() recomputes from scratch for backfills
+# and for bulk writes that bypass the model signals.
+
+STAT_FIELDS = ['played', 'won', 'drawn', 'lost', 'points_for', 'points_against']
+
+HEAD_TO_HEAD_MEETINGS = 5
+HEAD_TO_HEAD_MEETINGS_MAX = 20
+
+
+def record_aggregates():
+    """Aggregates computing STAT_FIELDS over a queryset of finished games."""
+    return {
+        'played': Count('pk'),
+        'won': Count('pk', filter=Q(dcb_score__gt=F('opp_score'))),
+        'drawn': Count('pk', filter=Q(dcb_score=F('opp_score'))),
+        'lost': Count('pk', filter=Q(dcb_score__lt=F('opp_score'))),
+        'points_for': Coalesce(Sum('dcb_score'), 0),
+        'points_against': Coalesce(Sum('opp_score'), 0),
+    }
+
+
+def game_state(game):
+    """The parts of a game that count towards standings."""
+    return (game.dcb_team_id, game.is_finished, game.dcb_score, game.opp_score)
+
+
+def contribution(state):
+    """What a game in ``state`` adds to its team's record."""
+    if state is None:
+        return {}
+    _, is_finished, dcb_score, opp_score = state
+    if not is_finished:
+        return {}
+    return {
+        'played': 1,
+        'won': int(dcb_score > opp_score),
+        'drawn': int(dcb_score == opp_score),
+        'lost': int(dcb_score < opp_score),
+        'points_for': dcb_score,
+        'points_against': opp_score,
+    }
+
+
+def streak(scores):
+    """Signed length of the current run of wins or losses in ``scores``,
+    most recent first."""
+    run = 0
+    for dcb_score, opp_score in scores:
+        outcome = (dcb_score > opp_score) - (dcb_score < opp_score)
+        if outcome == 0 or (run and (run > 0) != (outcome > 0)):
+            break
+        run += outcome
+    return run
+
+
+def update_streak(team_id):
+    # Walks back from the latest result only as far as the run goes
+    results = (Game.objects.filter(dcb_team_id=team_id, is_finished=True)
+               .order_by('-date', '-time', '-pk').values_list('dcb_score', 'opp_score'))
+    TeamSeasonStats.objects.filter(team_id=team_id).update(streak=streak(results.iterator()))
+
+
+def record_change(before, after, create_missing=True):
+    """Move a game's contribution from its ``before`` state to its ``after``
+    state (either may be ``None``). Call once the change is in the
+    database.
+
+    A team without a stats row is rebuilt from its games when
+    ``create_missing`` is set, and left alone otherwise.
+    """
+    deltas = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if not contribution(state):
+            continue
+        team_deltas = deltas.setdefault(state[0], dict.fromkeys(STAT_FIELDS, 0))
+        for field, value in contribution(state).items():
+            team_deltas[field] += sign * value
+
+    for team_id, team_deltas in deltas.items():
+        stats = TeamSeasonStats.objects.filter(team_id=team_id)
+        changes = {field: F(field) + value for field, value in team_deltas.items() if value}
+        # Moving a result in time can change the streak without changing
+        # any counter
+        exists = stats.update(**changes) if changes else stats.exists()
+        if exists:
+            update_streak(team_id)
+        elif create_missing:
+            rebuild([team_id])
+
+
+def rebuild(team_ids=None):
+    """Recompute the stats of ``team_ids`` (every team by default) from
+    their finished games. Returns the number of teams written."""
+    teams = Team.objects.all() if team_ids is None else Team.objects.filter(pk__in=team_ids)
+    games = Game.objects.filter(is_finished=True)
+    if team_ids is not None:
+        games = games.filter(dcb_team_id__in=team_ids)
+
+    totals = {
+        row.pop('dcb_team'): row
+        for row in games.values('dcb_team').annotate(**record_aggregates()).order_by()
+    }
+    ordered = games.order_by('dcb_team', '-date', '-time', '-pk').values_list('dcb_team', 'dcb_score', 'opp_score')
+    streaks = {
+        team_id: streak((dcb, opp) for _, dcb, opp in rows)
+        for team_id, rows in groupby(ordered.iterator(), key=lambda row: row[0])
+    }
+
+    rows = [
+        TeamSeasonStats(
+            team=team, sport=team.sport, season=team.season, year=team.year,
+            streak=streaks.get(team.pk, 0),
+            **totals.get(team.pk, dict.fromkeys(STAT_FIELDS, 0)),
+        )
+        for team in teams.only('pk', 'sport', 'season', 'year')
+    ]
+    with transaction.atomic():
+        TeamSeasonStats.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['team'],
+            update_fields=['sport', 'season', 'year', 'streak'] + STAT_FIELDS,
+        )
+    return len(rows)
+
+
+def head_to_head(team_name, opposition_id, meetings=HEAD_TO_HEAD_MEETINGS):
+    """A team's record against one opposition, from a single aggregate
+    query, and its latest ``meetings`` results."""
+    games = Game.objects.filter(dcb_team__name=team_name, opposition_id=opposition_id, is_finished=True)
+    record = games.aggregate(**record_aggregates())
+    latest = list(games.select_related('dcb_team', 'opposition').order_by(*GAME_ORDERING)[:meetings])
+    return record, latest
@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import os
+import warnings
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # listed in requirements.txt; without it only .gz variants are written
+    brotli = None
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each file under the SHA-256 of its content.
+
+    ``team.jpg`` becomes ``cas/3a/7f/3a7f...e1.jpg``: identical uploads share
+    one file and saving content that is already stored writes nothing. The
+    name a file was uploaded with is not kept on disk, so callers that want
+    it must record it themselves.
+    """
+
+    def __init__(self, prefix='cas', **kwargs):
+        # Two processes racing to store the same content write identical
+        # bytes, so let the second one overwrite instead of renaming
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def name_for(self, digest, original_name):
+        ext = os.path.splitext(original_name)[1].lower()
+        return f'{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def save_with_digest(self, digest, original_name, content):
+        """Store ``content`` whose digest the caller already knows."""
+        name = self.name_for(digest, original_name)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        return self.save_with_digest(digest.hexdigest(), name, content)
+
+
+# Formats worth compressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.map', '.ico'}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Static files under content-hashed names, each with ``.gz`` (and,
+    when the ``brotli`` package is installed, ``.br``) variants written
+    next to it by ``collectstatic``.
+
+    A hashed name changes whenever the content does, so it can be cached
+    forever; ``sports.serve.static_asset`` serves the variants with
+    immutable cache headers.
+    """
+    # Until collectstatic has run there is no manifest; fall back to the
+    # plain names rather than failing every page
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def hashed_name(self, name, content=None, filename=None):
+        # Vendored CSS points at source maps that aren't shipped; leave such
+        # references alone rather than failing collectstatic
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        written = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                # The plain copy stays too, for the manifest-less fallback
+                written.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if not dry_run:
+            if brotli is None:
+                warnings.warn('brotli is not installed; writing .gz static files only. Install requirements.txt for .br variants.')
+            for name in written:
+                self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data)
+        for ext, compressed in variants.items():
+            # Tiny files can grow; the original is served instead
+            if len(compressed) < len(data):
+                with open(path + ext, 'wb') as f:
+                    f.write(compressed)
+            elif os.path.exists(path + ext):
+                os.remove(path + ext)
@@ -1,6 +1,588 @@
-from django.test import TestCase
+import csv
+import datetime
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
+from . import jobs, search, standings
+from .models import Game, ImportManifest, Job, Legend, Opposition, Player, Team, TeamSeasonStats
+from .pagination import InvalidCursor, paginate_games, paginate_legends
+from .serve import byte_range, media_file
+from .sqlite_cache import SQLiteCache
 
-        
\ No newline at end of file
+
+# The settings ship with an empty SECRET_KEY, which Django refuses to sign
+# cookies with; the tests never need the real one
+settings.SECRET_KEY = 'tests'
+
+# Keeps tests off the file-based page cache and the rate limit database
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'pages', 'ratelimit')
+}
+
+
+def make_team(name='Varsity', sport='VB'):
+    # The roster template needs a team photo; the file itself is never read
+    return Team.objects.create(season='1', name=name, sport=sport, level='BV', honors='', photo='teams/photos/team.jpg')
+
+
+def make_game(team, opposition, day, score=None, time=datetime.time(15, 30)):
+    """A game on the ``day``-th of January 2025; finished with ``score``
+    ``(dcb, opp)`` when one is given."""
+    dcb_score, opp_score = score or (0, 0)
+    return Game.objects.create(
+        dcb_team=team, opposition=opposition, dcb_score=dcb_score, opp_score=opp_score, location='Home',
+        date=datetime.date(2025, 1, day), time=time, is_finished=score is not None,
+    )
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.path = os.path.join(self.workdir, 'cache.sqlite3')
+
+    def cache(self):
+        return SQLiteCache(self.path, {})
+
+    def test_add_keeps_live_key(self):
+        cache = self.cache()
+        self.assertTrue(cache.add('hits', 1))
+        self.assertFalse(cache.add('hits', 5))
+        self.assertEqual(cache.get('hits'), 1)
+
+    def test_add_replaces_expired_key(self):
+        cache = self.cache()
+        cache.set('hits', 7, timeout=0.01)
+        time.sleep(0.05)
+        self.assertIsNone(cache.get('hits'))
+        self.assertTrue(cache.add('hits', 1))
+        self.assertEqual(cache.get('hits'), 1)
+
+    def test_incr_is_shared_between_connections(self):
+        # Two instances stand in for two worker processes on the same file
+        first, second = self.cache(), self.cache()
+        first.add('hits', 0)
+        self.assertEqual(first.incr('hits'), 1)
+        self.assertEqual(second.incr('hits'), 2)
+        self.assertEqual(first.incr('hits', 3), 5)
+        self.assertEqual(second.get('hits'), 5)
+
+    def test_incr_missing_key(self):
+        with self.assertRaises(ValueError):
+            self.cache().incr('hits')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class GamePaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.team = make_team()
+        opposition = Opposition.objects.create(name='Rivals')
+        for day in range(1, 6):
+            make_game(cls.team, opposition, day, score=(1, 0))
+        # Shares a kick-off with the game on the 5th; pk breaks the tie
+        make_game(cls.team, Opposition.objects.create(name='Others'), 5, score=(2, 0))
+
+    def test_cursor_round_trip(self):
+        games = Game.objects.all()
+        pages, cursor = [], None
+        while True:
+            page, cursor = paginate_games(games, cursor, 2)
+            pages.append([g.pk for g in page])
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [2, 2, 2])
+        self.assertEqual(sum(pages, []), list(games.order_by('-date', '-time', '-pk').values_list('pk', flat=True)))
+
+    def test_invalid_cursor(self):
+        # Not base64 JSON, the wrong shape, and the right shape with bad values
+        for cursor in ('not a cursor', 'WzFd', 'WyJ4IiwieSIsMV0'):
+            with self.assertRaises(InvalidCursor):
+                paginate_games(Game.objects.all(), cursor, 2)
+
+    def test_results_api(self):
+        url = reverse('get_results_page', args=[self.team.name])
+        first = self.client.get(url, {'size': 4}).json()
+        second = self.client.get(url, {'size': 4, 'cursor': first['next']}).json()
+        self.assertEqual(len(first['games']) + len(second['games']), 6)
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(url, {'cursor': 'WzFd'}).status_code, 400)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LegendPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Two legends share a name, so pk has to break the tie
+        for name in ('Ada', 'Bo', 'Bo', 'Cy', 'Di'):
+            Legend.objects.create(name=name, teams='Varsity', description='')
+
+    def test_cursor_round_trip(self):
+        legends = Legend.objects.all()
+        ordered = list(legends.order_by('name', 'pk'))
+        first, previous, after = paginate_legends(legends, 2)
+        self.assertIsNone(previous)
+        second, previous, after = paginate_legends(legends, 2, after=after)
+        third, _, last = paginate_legends(legends, 2, after=after)
+        self.assertIsNone(last)
+        self.assertEqual(first + second + third, ordered)
+
+        # Going back from the second page lands on the first
+        back, previous, _ = paginate_legends(legends, 2, before=previous)
+        self.assertEqual(back, first)
+        self.assertIsNone(previous)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            paginate_legends(Legend.objects.all(), 2, after='WzEsMl0')
+        response = self.client.get(reverse('get_legends_page'), {'after': 'WzEsMl0'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('legends'), {'before': 'WzEsMl0'}).status_code, 404)
+
+    def test_legends_api(self):
+        url = reverse('get_legends_page')
+        first = self.client.get(url, {'size': 3}).json()
+        second = self.client.get(url, {'size': 3, 'after': first['next']}).json()
+        self.assertEqual(first['total'], 5)
+        self.assertEqual([l['name'] for l in first['legends'] + second['legends']], ['Ada', 'Bo', 'Bo', 'Cy', 'Di'])
+        self.assertIsNone(second['next'])
+
+
+class ByteRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(byte_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(byte_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(byte_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(byte_range('bytes=990-2000', 1000), (990, 999))
+        self.assertEqual(byte_range('bytes=-5000', 1000), (0, 999))
+
+    def test_whole_file(self):
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-9', 'bytes=9-1'):
+            self.assertIsNone(byte_range(header, 1000), header)
+
+    def test_unsatisfiable(self):
+        for header, size in (('bytes=1000-', 1000), ('bytes=-0', 1000), ('bytes=0-', 0), ('bytes=-5', 0)):
+            with self.assertRaises(ValueError, msg=header):
+                byte_range(header, size)
+
+
+class MediaFileTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with open(os.path.join(media_root, 'clip.bin'), 'wb') as f:
+            f.write(bytes(range(100)))
+        open(os.path.join(media_root, 'empty.bin'), 'wb').close()
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def get(self, path, **headers):
+        return media_file(RequestFactory().get('/', headers=headers), path)
+
+    def test_range(self):
+        response = self.get('clip.bin', Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_unsatisfiable_range(self):
+        response = self.get('empty.bin', Range='bytes=-5')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.get('clip.bin', Range='bytes=10-19', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+
+    def test_not_modified(self):
+        etag = self.get('clip.bin')['ETag']
+        self.assertEqual(self.get('clip.bin', **{'If-None-Match': etag}).status_code, 304)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PageCacheInvalidationTests(TestCase):
+    def setUp(self):
+        # Tag versions and pages would otherwise outlive the test's rows
+        caches['pages'].clear()
+        self.team = make_team()
+        self.player = Player.objects.create(team=self.team, first_name='Sam', last_name='Lee', position='Setter')
+
+    def roster(self, team):
+        return self.client.get(reverse('team', args=[team.name])).content.decode()
+
+    def test_roster_is_cached_until_a_player_changes(self):
+        self.assertIn('Setter', self.roster(self.team))
+        # update() sends no signal, so the cached page is still served
+        Player.objects.filter(pk=self.player.pk).update(position='Libero')
+        self.assertIn('Setter', self.roster(self.team))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.player.position = 'Middle'
+            self.player.save()
+        self.assertIn('Middle', self.roster(self.team))
+
+    def test_moving_a_player_refreshes_both_rosters(self):
+        other = make_team('Juniors')
+        self.assertIn('Setter', self.roster(self.team))
+        self.assertNotIn('Setter', self.roster(other))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.player.team = other
+            self.player.save()
+        self.assertNotIn('Setter', self.roster(self.team))
+        self.assertIn('Setter', self.roster(other))
+
+    def test_invalidation_waits_for_commit(self):
+        self.roster(self.team)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.player.position = 'Middle'
+            self.player.save()
+        # Until the write commits, a concurrent request may still see the old page
+        self.assertIn('Setter', self.roster(self.team))
+        for callback in callbacks:
+            callback()
+        self.assertIn('Middle', self.roster(self.team))
+
+
+def noop_task(*args):
+    pass
+
+
+def failing_task():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def test_a_job_is_claimed_once(self):
+        job = jobs.enqueue('sports.tests.noop_task', 1)
+        claimed = jobs.claim('worker-a')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.locked_by), ('running', 1, 'worker-a'))
+        self.assertIsNone(jobs.claim('worker-b'))
+
+    def test_future_jobs_wait(self):
+        job = jobs.enqueue('sports.tests.noop_task')
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now() + datetime.timedelta(minutes=1))
+        self.assertIsNone(jobs.claim('worker-a'))
+
+    def test_expired_lock_is_reclaimed(self):
+        jobs.enqueue('sports.tests.noop_task')
+        stalled = jobs.claim('worker-a', visibility_timeout=60)
+        Job.objects.filter(pk=stalled.pk).update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+
+        taken_over = jobs.claim('worker-b')
+        self.assertEqual((taken_over.pk, taken_over.locked_by, taken_over.attempts), (stalled.pk, 'worker-b', 2))
+        # The first worker finishing late must not overwrite the new owner's lock
+        jobs.run(stalled)
+        self.assertEqual(Job.objects.get(pk=stalled.pk).locked_by, 'worker-b')
+        self.assertEqual(jobs.run(taken_over), 'done')
+        self.assertEqual(Job.objects.get(pk=stalled.pk).status, 'done')
+
+    def test_abandoned_too_often_fails(self):
+        job = jobs.enqueue('sports.tests.noop_task')
+        Job.objects.filter(pk=job.pk).update(status='running', attempts=job.max_attempts, locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertIsNone(jobs.claim('worker-a'))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'failed')
+
+    def test_failure_is_retried_then_failed(self):
+        job = jobs.enqueue('sports.tests.failing_task')
+        Job.objects.filter(pk=job.pk).update(max_attempts=2)
+        with self.assertLogs('sports.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(jobs.claim('worker-a')), 'queued')
+        retry = Job.objects.get(pk=job.pk)
+        self.assertIn('boom', retry.last_error)
+        self.assertGreater(retry.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('sports.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(jobs.claim('worker-a')), 'failed')
+
+
+PLAYER_COLUMNS = ['team', 'first_name', 'last_name', 'position', 'year_group', 'kit_number', 'photo']
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImportExcelTests(TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.sheet = os.path.join(self.workdir, 'players.csv')
+
+    def write_sheet(self, rows):
+        with open(self.sheet, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(PLAYER_COLUMNS)
+            writer.writerows(rows)
+
+    def import_sheet(self, *flags):
+        out = StringIO()
+        call_command('import_excel', '-f', self.sheet, '--skip-images', *flags, stdout=out)
+        return out.getvalue().strip().splitlines()[-1]
+
+    def test_bulk_upsert(self):
+        self.write_sheet([
+            ['Varsity', 'Sam', 'Lee', 'Setter', '9.0', '4', ''],
+            ['Varsity', 'Kim', 'Ong', 'Libero', '', '', ''],
+            # Listed twice: the last row wins
+            ['Varsity', 'Sam', 'Lee', 'Outside', '9.0', '4', ''],
+        ])
+        self.assertIn('2 created, 0 updated', self.import_sheet('--bulk'))
+        sam = Player.objects.get(first_name='Sam')
+        self.assertEqual((sam.position, sam.year, sam.shirt_number), ('Outside', '9', 4))
+        self.assertEqual(Player.objects.get(first_name='Kim').year, '')
+
+        self.write_sheet([
+            ['Varsity', 'Sam', 'Lee', 'Middle', '10', '4', ''],
+            ['Varsity', 'Kim', 'Ong', 'Libero', '', '', ''],
+            ['Juniors', 'Ari', 'Tan', 'Setter', '8', '1', ''],
+        ])
+        # Kim is unchanged and isn't written
+        self.assertIn('1 created, 1 updated', self.import_sheet('--bulk'))
+        self.assertEqual(Player.objects.get(pk=sam.pk).position, 'Middle')
+        self.assertEqual(Player.objects.count(), 3)
+        self.assertEqual(Player.objects.get(first_name='Ari').team.name, 'Juniors')
+
+    def test_incremental_skips_unchanged_rows(self):
+        rows = [
+            ['Varsity', 'Sam', 'Lee', 'Setter', '9', '4', ''],
+            ['Varsity', 'Kim', 'Ong', 'Libero', '9', '5', ''],
+        ]
+        self.write_sheet(rows)
+        self.assertIn('2 created, 0 updated', self.import_sheet('--bulk', '--incremental'))
+        self.assertEqual(ImportManifest.objects.count(), 2)
+
+        # An edit made in the admin survives a re-import of an unchanged row
+        Player.objects.filter(first_name='Kim').update(position='Captain')
+        rows[0][3] = 'Middle'
+        self.write_sheet(rows)
+        self.assertIn('0 created, 1 updated, 0 photos attempted, 1 unchanged', self.import_sheet('--bulk', '--incremental'))
+        self.assertEqual(Player.objects.get(first_name='Sam').position, 'Middle')
+        self.assertEqual(Player.objects.get(first_name='Kim').position, 'Captain')
+
+        self.write_sheet(rows[:1])
+        self.assertIn('1 unchanged, 1 removed from the sheet', self.import_sheet('--bulk', '--incremental'))
+        self.assertTrue(Player.objects.filter(first_name='Kim').exists())
+        self.assertEqual(ImportManifest.objects.count(), 1)
+
+    def test_incremental_prune(self):
+        self.write_sheet([
+            ['Varsity', 'Sam', 'Lee', 'Setter', '9', '4', ''],
+            ['Varsity', 'Kim', 'Ong', 'Libero', '9', '5', ''],
+        ])
+        self.import_sheet('--incremental')
+        self.write_sheet([['Varsity', 'Sam', 'Lee', 'Setter', '9', '4', '']])
+        self.assertIn('1 deleted', self.import_sheet('--incremental', '--prune'))
+        self.assertEqual(list(Player.objects.values_list('first_name', flat=True)), ['Sam'])
+
+
+class StreakTests(SimpleTestCase):
+    def test_streak(self):
+        # Most recent result first
+        self.assertEqual(standings.streak([]), 0)
+        self.assertEqual(standings.streak([(3, 1), (2, 0), (0, 1)]), 2)
+        self.assertEqual(standings.streak([(0, 1), (1, 2), (3, 0)]), -2)
+        self.assertEqual(standings.streak([(1, 1), (3, 0)]), 0)
+
+
+class StandingsTests(TestCase):
+    STATS = ['played', 'won', 'drawn', 'lost', 'points_for', 'points_against', 'streak']
+
+    def setUp(self):
+        self.team = make_team()
+        self.opposition = Opposition.objects.create(name='Rivals')
+
+    def stats(self):
+        return TeamSeasonStats.objects.filter(team=self.team).values(*self.STATS).first()
+
+    def assertMatchesRebuild(self):
+        # The incrementally kept row must equal one computed from scratch
+        live = self.stats()
+        standings.rebuild([self.team.pk])
+        self.assertEqual(live, self.stats())
+        return live
+
+    def test_create_edit_delete(self):
+        win = make_game(self.team, self.opposition, 1, score=(3, 1))
+        upcoming = make_game(self.team, self.opposition, 2)
+        self.assertEqual(self.assertMatchesRebuild(), dict(zip(self.STATS, [1, 1, 0, 0, 3, 1, 1])))
+
+        upcoming.is_finished, upcoming.dcb_score, upcoming.opp_score = True, 0, 2
+        upcoming.save()
+        self.assertEqual(self.assertMatchesRebuild(), dict(zip(self.STATS, [2, 1, 0, 1, 3, 3, -1])))
+
+        win.dcb_score = 1
+        win.save()
+        self.assertEqual(self.assertMatchesRebuild(), dict(zip(self.STATS, [2, 0, 1, 1, 1, 3, -1])))
+
+        upcoming.delete()
+        self.assertEqual(self.assertMatchesRebuild(), dict(zip(self.STATS, [1, 0, 1, 0, 1, 1, 0])))
+
+    def test_moving_a_game_between_teams(self):
+        other = make_team('Juniors')
+        game = make_game(self.team, self.opposition, 1, score=(2, 0))
+        game.dcb_team = other
+        game.save()
+        self.assertEqual(self.assertMatchesRebuild()['played'], 0)
+        self.assertEqual(TeamSeasonStats.objects.get(team=other).won, 1)
+
+    def test_deleting_a_team_removes_its_row(self):
+        make_game(self.team, self.opposition, 1, score=(2, 0))
+        self.team.delete()
+        self.assertFalse(TeamSeasonStats.objects.exists())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+        self.team = make_team()
+        self.player = Player.objects.create(team=self.team, first_name='Sam', last_name='Lee')
+        self.url = reverse('team-list')
+
+    def test_not_modified_until_a_row_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': first['ETag']}).status_code, 304)
+        self.assertEqual(self.client.get(self.url, headers={'If-Modified-Since': first['Last-Modified']}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.player.position = 'Setter'
+            self.player.save()
+        second = self.client.get(self.url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_deleting_a_row_changes_the_etag(self):
+        Player.objects.create(team=self.team, first_name='Kim', last_name='Ong')
+        etag = self.client.get(self.url)['ETag']
+        # Leaves the newest updated_at alone; the row count changes the ETag
+        with self.captureOnCommitCallbacks(execute=True):
+            self.player.delete()
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_profile_etag_is_weak(self):
+        url = reverse('player', args=[self.team.name, self.player.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.team = make_team()
+        self.player = Player.objects.create(team=self.team, first_name='Jonah', last_name='Smith', quote='Never give up')
+
+    def titles(self, text):
+        return [(hit['kind'], hit['title']) for hit in search.search(text)]
+
+    def test_saved_objects_are_found_by_word_prefixes(self):
+        Legend.objects.create(name='Joan Smithers', teams='Varsity', description='')
+        self.assertEqual(set(self.titles('jo smi')), {('player', 'Jonah Smith'), ('legend', 'Joan Smithers')})
+        self.assertEqual(self.titles('give'), [('player', 'Jonah Smith')])
+        self.assertEqual(self.titles('varsity'), [('team', 'Varsity')] + [('legend', 'Joan Smithers')])
+
+    def test_names_rank_above_bodies(self):
+        Legend.objects.create(name='Giver', teams='Varsity', description='')
+        self.assertEqual(self.titles('give')[0], ('legend', 'Giver'))
+
+    def test_edits_and_deletes_update_the_index(self):
+        self.player.last_name = 'Jones'
+        self.player.save()
+        self.assertEqual(self.titles('smith'), [])
+        self.assertEqual(self.titles('jones'), [('player', 'Jonah Jones')])
+        self.player.delete()
+        self.assertEqual(self.titles('jones'), [])
+
+    def test_renaming_a_team_reindexes_its_players(self):
+        self.team.name = 'Seniors'
+        self.team.save()
+        hit = search.search('jonah')[0]
+        self.assertEqual(hit['url'], reverse('player', args=['Seniors', self.player.pk]))
+
+    def test_query_syntax_is_inert(self):
+        for text in ('"', 'smith OR', 'NEAR(a b)', '*', ''):
+            search.search(text)
+        self.assertEqual(self.titles('smith"*'), [('player', 'Jonah Smith')])
+
+    def test_rebuild_after_bulk_writes(self):
+        Player.objects.bulk_create([Player(team=self.team, first_name='Ari', last_name='Tan')])
+        self.assertEqual(self.titles('ari'), [])
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(self.titles('ari'), [('player', 'Ari Tan')])
+
+    def test_api(self):
+        response = self.client.get(reverse('get_search'), {'q': 'jonah', 'limit': 1000})
+        self.assertEqual([hit['title'] for hit in response.json()['results']], ['Jonah Smith'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImportGamesTests(TestCase):
+    def setUp(self):
+        self.team = make_team()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.sheet = os.path.join(self.workdir, 'games.csv')
+
+    def import_times(self, *times, score=''):
+        with open(self.sheet, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['team', 'opposition', 'date', 'time', 'location', 'dcb_score', 'opp_score'])
+            for time in times:
+                writer.writerow(['Varsity', 'Rivals', '2025-03-01', time, 'Home', score, score])
+        out = StringIO()
+        call_command('import_games', '-f', self.sheet, stdout=out)
+        return out.getvalue().strip().splitlines()[-1]
+
+    def stored_times(self):
+        return sorted(t.strftime('%H:%M') for t in Game.objects.values_list('time', flat=True))
+
+    def test_rescheduled_kick_off_moves_the_game(self):
+        self.import_times('15:30', score='1')
+        game = Game.objects.get()
+        self.assertIn('0 games created, 1 updated', self.import_times('17:00', score='2'))
+        game.refresh_from_db()
+        self.assertEqual((game.time, game.dcb_score), (datetime.time(17), 2))
+
+    def test_doubleheaders_are_kept(self):
+        self.import_times('10:00', '14:00')
+        self.assertEqual(self.stored_times(), ['10:00', '14:00'])
+        # One of the two moved
+        self.assertIn('0 games created, 2 updated', self.import_times('10:00', '15:00'))
+        self.assertEqual(self.stored_times(), ['10:00', '15:00'])
+        # Both moved: no way to tell which is which, so nothing is overwritten
+        self.assertIn('2 games created, 0 updated', self.import_times('11:00', '16:00'))
+        self.assertEqual(self.stored_times(), ['10:00', '11:00', '15:00', '16:00'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HeadToHeadTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+        self.team = make_team()
+        self.opposition = Opposition.objects.create(name='Rivals')
+        make_game(self.team, self.opposition, 1, score=(3, 1))
+        make_game(self.team, self.opposition, 2, score=(0, 2))
+
+    def get(self, team_name, opposition_id, **params):
+        return self.client.get(reverse('get_head_to_head', args=[team_name, opposition_id]), params)
+
+    def test_record(self):
+        data = self.get(self.team.name, self.opposition.pk, last=1).json()
+        self.assertEqual((data['played'], data['won'], data['lost']), (2, 1, 1))
+        self.assertEqual([game['time'] for game in data['meetings']], ['2025-01-02 15:30'])
+
+    def test_unknown_team_or_opposition(self):
+        self.assertEqual(self.get('Nobody', self.opposition.pk).status_code, 404)
+        self.assertEqual(self.get(self.team.name, self.opposition.pk + 100).status_code, 404)
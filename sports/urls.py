@@ -1,13 +1,27 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from . import views
 
+# Under ASGI the async "load more" views keep slow clients off the thread pool
+if getattr(settings, 'SPORTS_ASYNC_API', False):
+    more_results, more_upcomings = views.get_more_results_async, views.get_more_upcomings_async
+else:
+    more_results, more_upcomings = views.get_more_results, views.get_more_upcomings
+
 urlpatterns = [
     path('', views.index, name='index-page'),
     path('teams/', views.teams, name='team-list'),
     path('teams/<str:team_name>/', views.rooster, name='team'),
     path('teams/<str:team_name>/<int:pk>', views.profile, name='player'),
     path('legends/', views.legends, name='legends'),
-    path('api/more-games/<str:team_name>/<int:amount>', views.get_more_results, name='get_more_results'),
-    path('api/more-upcomings/<str:team_name>/<int:amount>', views.get_more_upcomings, name='get_more_upcomings'),
+    path('standings/<str:sport>/<int:year>/<str:season>/', views.standings, name='standings'),
+    path('api/more-games/<str:team_name>/<int:amount>', more_results, name='get_more_results'),
+    path('api/more-upcomings/<str:team_name>/<int:amount>', more_upcomings, name='get_more_upcomings'),
+    path('api/results/<str:team_name>/', views.get_results_page, name='get_results_page'),
+    path('api/upcomings/<str:team_name>/', views.get_upcomings_page, name='get_upcomings_page'),
+    path('api/team/<str:team_name>/', views.get_team_bundle, name='get_team_bundle'),
+    path('api/legends/', views.get_legends_page, name='get_legends_page'),
+    path('api/search/', views.get_search, name='get_search'),
+    path('api/head-to-head/<str:team_name>/<int:opposition_id>/', views.get_head_to_head, name='get_head_to_head'),
 ] 
\ No newline at end of file
@@ -1,14 +1,33 @@
 from django.shortcuts import get_object_or_404, render
-from django.core.paginator import Paginator
-from .models import Team, Player, Event, Game, Legend, Coach
-from django_ratelimit.decorators import ratelimit
+from django.http import Http404
+from django.conf import settings
+from .models import Team, Player, Event, Game, Legend, Coach, Opposition, TeamSeasonStats
+from .loaders import ROSTER_GAMES, load_profile, load_roster, team_queryset
+from .pagination import GAME_ORDERING, InvalidCursor, game_cursor, page_size, paginate_games, paginate_legends
+from .cache import cache_page_by_tags, conditional_on, get_or_set_by_tags
+from .standings import HEAD_TO_HEAD_MEETINGS, HEAD_TO_HEAD_MEETINGS_MAX, head_to_head
+from .search import SEARCH_RESULTS, SEARCH_RESULTS_MAX, search
+from .ratelimit import ratelimit
 from django.http import JsonResponse
 
 # Create your views here.
+
+# What each view's validators are computed from, and the cache tags that
+# change with them; see sports.cache.conditional_on
+def team_game_rows(team_name, **kwargs):
+    return [Team.objects.filter(name=team_name), Game.objects.filter(dcb_team__name=team_name), Opposition.objects.all()]
+
+def team_tags(team_name, **kwargs):
+    return ['rosters', f'team:{team_name}']
+
+
+@conditional_on(lambda: [Event.objects.all(), Game.objects.all(), Team.objects.all(), Opposition.objects.all()], lambda: ['index'])
+@cache_page_by_tags('index', lambda: ['index'])
 def index(request):
     events = Event.objects.all().order_by('-date')[:4]  
-    results = Game.objects.all().order_by('-date')[:4]
-    upcomings = Game.objects.filter(is_finished=False).order_by('-date')[:4]
+    games = Game.objects.select_related('dcb_team', 'opposition')
+    results = games.order_by('-date')[:4]
+    upcomings = games.filter(is_finished=False).order_by('-date')[:4]
 
     context = {
         'events':events,
@@ -17,81 +36,262 @@ def index(request):
     }
     return render(request, 'index.html', context)
 
+@conditional_on(lambda: [Team.objects.all(), Player.objects.all(), Coach.objects.all()], lambda: ['teams'])
+@cache_page_by_tags('teams', lambda: ['teams'])
 def teams(request):
-    teams = Team.objects.all()
+    teams = team_queryset()
     return render(request, 'team_list.html', {'teams': teams})
 
 
+@conditional_on(lambda team_name: team_game_rows(team_name) + [
+    Player.objects.filter(team__name=team_name), Coach.objects.filter(team__name=team_name)], team_tags)
+@cache_page_by_tags('roster', team_tags)
 def rooster(request, team_name):
-    team = get_object_or_404(Team, name=team_name)
-    players = Player.objects.filter(team=team).exclude(is_captain=True).order_by('-shirt_number').reverse()
-    captain = Player.objects.filter(is_captain=True).first()
-    results = Game.objects.filter(dcb_team=team).order_by('-date')[:2]
-    upcomings = Game.objects.filter(is_finished=False, dcb_team=team).order_by('-date')[:2]
+    context = load_roster(team_name)
+    return render(request, 'player_list.html', context)
 
 
-    context = {
-        'team':team,
-        'players':players,
-        'captain':captain,
-        'results':results,
-        'upcomings': upcomings,
-    }
+# Weak: the teammates shown are a fresh random sample on every render
+@conditional_on(lambda team_name, pk: [Team.objects.filter(name=team_name), Player.objects.filter(team__name=team_name)], team_tags, weak=True)
+def profile(request, team_name, pk):
+    context = load_profile(team_name, pk)
+    return render(request, 'player_profile.html', context)
 
-    return render(request, 'player_list.html', context)
 
+def legend_count():
+    return get_or_set_by_tags('legend_count', [], ['legends'], Legend.objects.count)
 
-def profile(request, team_name, pk):
-    player = get_object_or_404(Player, pk=pk)
-    teamIn = get_object_or_404(Team, name=team_name)
-    teamates = Player.objects.filter(team=teamIn).exclude(pk=pk).order_by('?')[:4]
+def legends_page(request):
+    """``paginate_legends`` for the ``?after=``/``?before=`` cursors and
+    ``?size=`` of the request."""
+    size = page_size(request, getattr(settings, 'SPORTS_LEGENDS_PAGE_SIZE', 12), getattr(settings, 'SPORTS_LEGENDS_PAGE_SIZE_MAX', 48))
+    return paginate_legends(Legend.objects.all(), size, request.GET.get('after'), request.GET.get('before'))
+
+# Pages are linked with ``?after=``/``?before=`` cursors rather than page
+# numbers, so no page needs an OFFSET scan and the total is counted once
+# per change to the legends.
+@conditional_on(lambda: [Legend.objects.all()], lambda: ['legends'])
+def legends(request):
+    try:
+        legends, previous_cursor, next_cursor = legends_page(request)
+    except InvalidCursor:
+        raise Http404
 
     context = {
-        'teamates': teamates,
-        'player': player
+        'legends': legends,
+        'previous_cursor': previous_cursor,
+        'next_cursor': next_cursor,
+        'total': legend_count(),
     }
+    return render(request, 'legends.html', context)
 
-    return render(request, 'player_profile.html', context)
+@conditional_on(lambda sport, year, season: [
+    Team.objects.filter(sport=sport, year=year, season=season),
+    Game.objects.filter(dcb_team__sport=sport, dcb_team__year=year, dcb_team__season=season),
+], lambda **kwargs: ['standings'])
+@cache_page_by_tags('standings', lambda sport, year, season: ['standings'])
+def standings(request, sport, year, season):
+    sports = dict(Team.SPORT_CHOICES)
+    seasons = dict(Team.SEASON_CHOICES)
+    if sport not in sports or season not in seasons:
+        raise Http404
+    table = TeamSeasonStats.objects.filter(sport=sport, year=year, season=season).select_related('team')
 
+    context = {
+        'table': table,
+        'sport': sports[sport],
+        'season': seasons[season],
+        'year': year,
+    }
+    return render(request, 'standings.html', context)
 
-def legends(request):
-    legends = Legend.objects.all()
-    
-    # Paginator
-    paginator = Paginator(legends, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def result_json(result):
+    return {
+        'dcb_team':str(result.dcb_team),
+        'opposition':str(result.opposition),
+        'time':result.datetime_combined.strftime('%Y-%m-%d %H:%M'),
+        'location':result.location,
+        'dcb_score':result.dcb_score,
+        'opp_score':result.opp_score,
+    }
+
+def upcoming_json(upcoming):
+    return {
+        'pk': upcoming.pk,
+        'time':upcoming.datetime_combined.strftime('%Y-%m-%d %H:%M'),
+        'location':upcoming.location,
+        'dcb_team':str(upcoming.dcb_team),
+        'opposition':str(upcoming.opposition)
+    }
 
-    return render(request, 'legends.html', {'page_obj':page_obj})
+def team_games(team_name, is_finished):
+    return Game.objects.filter(dcb_team__name=team_name, is_finished=is_finished).select_related('dcb_team', 'opposition')
 
 @ratelimit(key='ip', rate="100/min")
+@conditional_on(team_game_rows, team_tags)
 def get_more_results(request, team_name, amount):
-    results = Game.objects.filter(dcb_team__name=team_name, is_finished=True).order_by('-date')[amount: amount + 4]
-    result_data = []
-    for result in results:
-        result_data.append({
-            'dcb_team':str(result.dcb_team),
-            'opposition':str(result.opposition),
-            'time':result.datetime_combined.strftime('%Y-%m-%d %H:%M'),
-            'location':result.location,
-            'dcb_score':result.dcb_score,
-            'opp_score':result.opp_score,
-        })
-
-    return JsonResponse({'games':result_data})
+    results = team_games(team_name, True).order_by('-date')[amount: amount + 4]
+    return JsonResponse({'games':[result_json(result) for result in results]})
     
 @ratelimit(key='ip', rate="100/min")
+@conditional_on(team_game_rows, team_tags)
 def get_more_upcomings(request, team_name, amount):
-    upcomings = Game.objects.filter(dcb_team__name=team_name, is_finished=False).order_by('-date')[amount: amount + 4]
-    upcoming_data = []
-
-    for upcoming in upcomings:
-        upcoming_data.append({
-            'pk': upcoming.pk,
-            'time':upcoming.datetime_combined.strftime('%Y-%m-%d %H:%M'),
-            'location':upcoming.location,
-            'dcb_team':str(upcoming.dcb_team),
-            'opposition':str(upcoming.opposition)
-        })
-
-    return JsonResponse({'games':upcoming_data})
\ No newline at end of file
+    upcomings = team_games(team_name, False).order_by('-date')[amount: amount + 4]
+    return JsonResponse({'games':[upcoming_json(upcoming) for upcoming in upcomings]})
+
+# Async versions of the two endpoints above, routed instead of them when
+# SPORTS_ASYNC_API is on; under ASGI a slow client then holds a coroutine
+# rather than a thread. The ORM calls stream rows with aiterator().
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(team_game_rows, team_tags)
+async def get_more_results_async(request, team_name, amount):
+    results = team_games(team_name, True).order_by('-date')[amount: amount + 4]
+    return JsonResponse({'games': [result_json(result) async for result in results.aiterator()]})
+
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(team_game_rows, team_tags)
+async def get_more_upcomings_async(request, team_name, amount):
+    upcomings = team_games(team_name, False).order_by('-date')[amount: amount + 4]
+    return JsonResponse({'games': [upcoming_json(upcoming) async for upcoming in upcomings.aiterator()]})
+
+def player_json(player):
+    return {
+        'pk': player.pk,
+        'name': str(player),
+        'position': player.position,
+        'year': player.year,
+        'shirt_number': player.shirt_number,
+        'is_captain': player.is_captain,
+        'photo': player.card_url if player.photo else player.profile_pic_url(),
+    }
+
+def stats_json(stats):
+    if stats is None:
+        return None
+    return {
+        'played': stats.played,
+        'won': stats.won,
+        'drawn': stats.drawn,
+        'lost': stats.lost,
+        'points_for': stats.points_for,
+        'points_against': stats.points_against,
+        'points_difference': stats.points_difference,
+        'streak': stats.streak,
+    }
+
+# Everything the roster page shows, as one JSON document: the team, its
+# players and standings row, and the latest results and upcomings with the
+# cursors get_results_page/get_upcomings_page continue from.
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(lambda team_name: team_game_rows(team_name) + [Player.objects.filter(team__name=team_name)], team_tags)
+async def get_team_bundle(request, team_name):
+    team = await Team.objects.filter(name=team_name).afirst()
+    if team is None:
+        raise Http404
+    players = Player.objects.filter(team=team).order_by('shirt_number', 'last_name', 'first_name')
+    games = Game.objects.filter(dcb_team=team).select_related('dcb_team', 'opposition').order_by(*GAME_ORDERING)
+    results = [game async for game in games.filter(is_finished=True)[:ROSTER_GAMES].aiterator()]
+    upcomings = [game async for game in games.filter(is_finished=False)[:ROSTER_GAMES].aiterator()]
+    stats = await TeamSeasonStats.objects.filter(team=team).afirst()
+
+    return JsonResponse({
+        'team': {
+            'name': team.name,
+            'title': str(team),
+            'sport': team.sport,
+            'level': team.level,
+            'season': team.season,
+            'year': team.year,
+            'description': team.description,
+            'honors': team.honors,
+            'instagram': team.instagram,
+        },
+        'players': [player_json(player) async for player in players.aiterator()],
+        'stats': stats_json(stats),
+        'results': {'games': [result_json(game) for game in results], 'next': game_cursor(results[-1]) if results else None},
+        'upcomings': {'games': [upcoming_json(game) for game in upcomings], 'next': game_cursor(upcomings[-1]) if upcomings else None},
+    })
+
+# Cursor-paginated variants of the two endpoints above. ``?cursor=`` is the
+# ``next`` value of the previous page (omit it for the first page) and
+# ``?size=`` is capped by SPORTS_GAMES_PAGE_SIZE_MAX.
+def games_page(request, queryset, serialize):
+    try:
+        games, next_cursor = paginate_games(queryset, request.GET.get('cursor'), page_size(request))
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    return JsonResponse({'games': [serialize(game) for game in games], 'next': next_cursor})
+
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(team_game_rows, team_tags)
+def get_results_page(request, team_name):
+    return games_page(request, team_games(team_name, True), result_json)
+
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(team_game_rows, team_tags)
+def get_upcomings_page(request, team_name):
+    return games_page(request, team_games(team_name, False), upcoming_json)
+
+# ``?last=`` sets how many recent meetings are listed, up to
+# HEAD_TO_HEAD_MEETINGS_MAX.
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(lambda team_name, opposition_id: [
+    Team.objects.filter(name=team_name),
+    Game.objects.filter(dcb_team__name=team_name, opposition_id=opposition_id),
+    Opposition.objects.filter(pk=opposition_id),
+], team_tags)
+def get_head_to_head(request, team_name, opposition_id):
+    try:
+        last = int(request.GET.get('last', HEAD_TO_HEAD_MEETINGS))
+    except ValueError:
+        last = HEAD_TO_HEAD_MEETINGS
+    last = max(1, min(last, HEAD_TO_HEAD_MEETINGS_MAX))
+
+    def compute():
+        # Raised before anything is cached, so the 404 isn't stored either
+        if not Team.objects.filter(name=team_name).exists():
+            raise Http404
+        opposition = get_object_or_404(Opposition, pk=opposition_id)
+        record, meetings = head_to_head(team_name, opposition.pk, last)
+        return {
+            'team': team_name,
+            'opposition': {'id': opposition.pk, 'name': opposition.name},
+            **record,
+            'meetings': [result_json(game) for game in meetings],
+        }
+
+    # Games of the team bump its tag; an opposition rename bumps 'rosters'
+    data = get_or_set_by_tags('head_to_head', [team_name, opposition_id, last], team_tags(team_name), compute)
+    return JsonResponse(data)
+
+# ``?q=`` is matched word by word as prefixes, so "jo sm" finds John Smith;
+# ``?limit=`` caps the results at SEARCH_RESULTS_MAX.
+@ratelimit(key='ip', rate="100/min")
+def get_search(request):
+    try:
+        limit = int(request.GET.get('limit', SEARCH_RESULTS))
+    except ValueError:
+        limit = SEARCH_RESULTS
+    limit = max(1, min(limit, SEARCH_RESULTS_MAX))
+    query = request.GET.get('q', '')[:200]
+    return JsonResponse({'query': query, 'results': search(query, limit)})
+
+def legend_json(legend):
+    return {
+        'id': legend.pk,
+        'name': legend.name,
+        'teams': legend.teams,
+        'description': legend.description,
+        'image': legend.profile_pic_url(),
+    }
+
+# Infinite scroll for the legends page: ``?after=`` is the ``next`` value of
+# the previous response (omit it for the first page).
+@ratelimit(key='ip', rate="100/min")
+@conditional_on(lambda: [Legend.objects.all()], lambda: ['legends'])
+def get_legends_page(request):
+    try:
+        legends, _, next_cursor = legends_page(request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    return JsonResponse({'legends': [legend_json(legend) for legend in legends], 'next': next_cursor, 'total': legend_count()})